@@ -0,0 +1,209 @@
+"""
+크롤링 주기 전체(main.update_bias)를 로컬 대역 서버(bench/fake_sites.py)와 일회용 MySQL로 실행하는 벤치마크.
+그룹 인원 100, 1,000, 10,000명에서 주기마다 걸린 시간, HTTP 요청 수, SQL 문 수, 최대 메모리를 잰다.
+
+- 첫 주기는 모든 사용자를 초기화 작업 큐에 넣고, 작업자가 하는 일(onboarding.onboard_once)을 큐가 빌 때까지 이 프로세스에서 실행한다.
+  초기화 시간은 이 주기에 들어가며, 다음 주기부터는 --active 비율의 사용자에게 새 제출을 추가한 뒤 크롤링한다.
+- DB는 BENCH_DB_HOST, BENCH_DB_PORT, BENCH_DB_USER, BENCH_DB_PASSWORD로 접속해
+  bench_<인원>_<pid> 데이터베이스를 만들고 migrations/001~ 스키마를 적용한 뒤, 끝나면 지운다. (운영 DB를 가리키지 말 것)
+- SQL 문 수는 서버 전체의 Questions 상태 값 차이이므로 다른 클라이언트가 없는 MySQL을 써야 정확하다.
+- 인원마다 별도 프로세스에서 실행하므로 크롤러의 전역 상태와 메모리 측정이 섞이지 않는다.
+- fetch가 사용자마다 0.3초 쉬므로 시간은 대부분 --workers에 따라 정해진다.
+- Python 최대 메모리는 tracemalloc으로 재므로 시간에 그 부담이 조금 더해진다. 주기 사이의 비교에는 영향이 없다.
+- 반영한 사용자가 없거나 (주기가 둘 이상인데) 점수 기록이 없으면 측정값을 내지 않고 실패한다.
+
+    cd crawling
+    BENCH_DB_HOST=127.0.0.1 BENCH_DB_USER=root BENCH_DB_PASSWORD=... python -m bench.bench_crawl [--members 100,1000,10000] [--output result.json]
+"""
+import os, sys, json, time, argparse, datetime, resource, subprocess, tracemalloc
+import pymysql
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CRAWLING = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIGRATIONS = os.path.join(os.path.dirname(CRAWLING), "migrations")
+
+def db_config() -> dict:
+    return {
+        "host": os.getenv("BENCH_DB_HOST", "127.0.0.1"),
+        "port": int(os.getenv("BENCH_DB_PORT", "3306")),
+        "user": os.getenv("BENCH_DB_USER", "root"),
+        "password": os.getenv("BENCH_DB_PASSWORD", ""),
+    }
+
+def migrate(connection, database: str) -> None:
+    """
+    migrations/의 001부터 차례로 적용한다. (000은 운영 DB 덤프라 건너뛴다)
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE DATABASE `{database}` DEFAULT CHARACTER SET utf8mb4")
+        cursor.execute(f"USE `{database}`")
+        for file_name in sorted(os.listdir(MIGRATIONS)):
+            if not file_name.endswith(".sql") or file_name.startswith("000"): continue
+            with open(os.path.join(MIGRATIONS, file_name), encoding="utf-8") as f:
+                sql = "\n".join(line for line in f if not line.lstrip().startswith("--"))
+            for statement in sql.split(";"):
+                if statement.strip(): cursor.execute(statement)
+    connection.commit()
+
+def questions(connection) -> int:
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW GLOBAL STATUS LIKE 'Questions'")
+        return int(cursor.fetchone()[1])
+
+def counter(snapshot: dict, prefix: str) -> int:
+    return sum(value for key, value in snapshot["counters"].items() if key.startswith(prefix))
+
+def rejected(snapshot: dict) -> int:
+    return sum(value for key, value in snapshot["counters"].items() if key.startswith("http_requests_total") and 'status="429"' in key)
+
+def run_child(args) -> dict:
+    """
+    인원 args.child명으로 대역 서버와 DB를 준비하고 크롤링 주기를 args.cycles번 실행한다.
+    """
+    members = args.child
+    config = db_config()
+    database = f"bench_{members}_{os.getpid()}"
+    monitor = pymysql.connect(**config)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "bench.fake_sites", "--members", str(members), "--latency", str(args.latency), "--rate", str(args.rate),
+         "--page-window", str(args.page_window)],
+        cwd=CRAWLING, stdout=subprocess.PIPE, stdin=subprocess.DEVNULL, text=True)
+    try:
+        _, boj, _, solvedac = server.stdout.readline().split()
+        migrate(monitor, database)
+        cycles = run_cycles(args, config, database, boj, solvedac, monitor)
+        check(cycles, monitor)
+        return {"members": members, "database": database, "cycles": cycles}
+    finally:
+        server.terminate()
+        if not args.keep_db:
+            with monitor.cursor() as cursor:
+                cursor.execute(f"DROP DATABASE IF EXISTS `{database}`")
+        monitor.close()
+
+def check(cycles: list, monitor) -> None:
+    """
+    크롤링이 실제로 일어났는지 확인한다. 사용자를 하나도 반영하지 않았거나 점수 기록이 없으면
+    측정값이 의미가 없으므로 결과를 내지 않고 실패한다.
+    """
+    crawled = sum(row["users_crawled"] for row in cycles)
+    if crawled == 0:
+        raise RuntimeError("DB에 반영한 사용자가 없습니다. (초기화나 크롤링이 동작하지 않았습니다)")
+    with monitor.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM score_history")
+        scores = cursor.fetchone()[0]
+    if len(cycles) > 1 and sum(row["users_crawled"] for row in cycles[1:]) == 0:
+        raise RuntimeError("초기화 뒤의 주기에서 크롤링한 사용자가 없습니다. (모두 초기화 중으로 남았을 수 있습니다)")
+    if len(cycles) > 1 and scores == 0:
+        raise RuntimeError(f"사용자 {crawled}명을 반영했지만 점수 기록이 하나도 없습니다.")
+
+def run_cycles(args, config: dict, database: str, boj: str, solvedac: str, monitor) -> list:
+    # 크롤러 모듈은 import할 때 환경 변수를 읽으므로 먼저 대역 서버와 일회용 DB를 가리키게 한다.
+    os.environ.update({
+        "DB_HOST": config["host"], "DB_PORT": str(config["port"]), "DB_USER": config["user"],
+        "DB_PASSWORD": config["password"], "DB_DATABASE": database,
+        "GROUP_RANK": f"{boj}/group/ranklist/1", "USER_INFO": f"{boj}/user", "USER_SUBMISSION": f"{boj}/status?",
+        "PROBLEM_TIER_API": f"{solvedac}/api/v3/problem/show", "USER_TIER_API": f"{solvedac}/api/v3/user/show",
+        "PROBLEM_LOOKUP_API": f"{solvedac}/api/v3/problem/lookup",
+        "CRAWL_WORKERS": str(args.workers), "CRAWL_ROLE": "standalone", "METRICS_PORT": "0", "METRICS_JSON": "",
+        "ONBOARDING_DELAY": "0",
+    })
+    import requests
+    import main, logger, metrics
+    from repository import service
+    from score import onboarding
+    logger.set_writer(open(args.log or os.devnull, "a"))
+
+    results = []
+    try:
+        main.init()
+        for cycle in range(args.cycles):
+            if cycle > 0:
+                requests.post(f"{boj}/_advance?fraction={args.active}&solves={args.solves}&seed={cycle}")
+            before, sql_before = metrics.snapshot(), questions(monitor)
+            tracemalloc.start()
+            started = time.perf_counter()
+            main.update_bias()
+            if cycle == 0:
+                drain_onboarding(onboarding, service)
+            wall = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            after, sql_after = metrics.snapshot(), questions(monitor)
+            results.append({
+                "members": args.child,
+                "cycle": cycle,
+                "kind": "init" if cycle == 0 else "update",
+                "wall_seconds": round(wall, 3),
+                "http_requests": counter(after, "http_requests_total") - counter(before, "http_requests_total"),
+                "http_429": rejected(after) - rejected(before),
+                "sql_statements": sql_after - sql_before - 1,  # 직전 SHOW STATUS 한 번은 빼고 센다.
+                "users_crawled": counter(after, "users_crawled_total") - counter(before, "users_crawled_total"),
+                "score_rows": counter(after, 'rows_written_total{table="score_history"}') - counter(before, 'rows_written_total{table="score_history"}'),
+                "peak_traced_mb": round(peak / 1024 / 1024, 1),
+                "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            })
+    finally:
+        logger.flush()
+    return results
+
+def drain_onboarding(onboarding, service) -> None:
+    """
+    초기화 작업 큐가 빌 때까지 처리한다. 실패해 나중으로 미뤄진 사용자가 남으면 이후 주기가 그 사용자를 건너뛰므로 멈춘다.
+    """
+    with service.session():
+        while onboarding.onboard_once(datetime.datetime.now()):
+            pass
+        with service.transaction():
+            left = service.get_initializing_names()
+    if left:
+        raise RuntimeError(f"초기화하지 못한 사용자가 {len(left)}명 남았습니다. (--log로 원인을 확인하세요)")
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=CRAWLING, text=True).strip()
+    except Exception:
+        return "unknown"
+
+def report(rows: list) -> None:
+    print(f'{"인원":>7} {"주기":>4} {"종류":>6} {"시간(초)":>9} {"HTTP":>7} {"429":>5} {"SQL":>8} {"사용자":>7} {"점수":>6} {"Python 최대(MB)":>15} {"RSS(MB)":>8}')
+    for row in rows:
+        print(f'{row["members"]:>7} {row["cycle"]:>4} {row["kind"]:>6} {row["wall_seconds"]:>9.2f} {row["http_requests"]:>7} {row["http_429"]:>5} '
+              f'{row["sql_statements"]:>8} {row["users_crawled"]:>7} {row["score_rows"]:>6} {row["peak_traced_mb"]:>15.1f} {row["max_rss_mb"]:>8.1f}')
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="크롤링 주기 전체 벤치마크")
+    parser.add_argument("--members", default="100,1000,10000", help="쉼표로 구분한 그룹 인원")
+    parser.add_argument("--cycles", type=int, default=3, help="인원마다 실행할 주기 수 (첫 주기는 초기화)")
+    parser.add_argument("--active", type=float, default=0.1, help="주기마다 새 제출이 생기는 사용자 비율")
+    parser.add_argument("--solves", type=int, default=3, help="활동한 사용자마다 새로 맞은 문제 수")
+    parser.add_argument("--latency", type=float, default=0.02, help="대역 서버 응답 지연(초)")
+    parser.add_argument("--rate", type=float, default=0.0, help="사이트별 초당 허용 요청 수 (0이면 제한 없음)")
+    parser.add_argument("--workers", type=int, default=8, help="CRAWL_WORKERS")
+    parser.add_argument("--page-window", type=int, default=10, help="랭킹 페이지 목록에 보여 줄 링크 수 (BOJ처럼 10개씩, 0이면 모든 페이지)")
+    parser.add_argument("--output", help="결과를 JSON으로 저장할 파일 (커밋 간 비교용)")
+    parser.add_argument("--log", help="크롤러 로그를 덧붙일 파일 (기본: 버림)")
+    parser.add_argument("--keep-db", action="store_true", help="끝난 뒤 벤치마크 DB를 지우지 않는다.")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args)))
+        sys.exit(0)
+
+    rows = []
+    for members in map(int, args.members.split(",")):
+        command = [sys.executable, "-m", "bench.bench_crawl", "--child", str(members),
+                   "--cycles", str(args.cycles), "--active", str(args.active), "--solves", str(args.solves),
+                   "--latency", str(args.latency), "--rate", str(args.rate), "--workers", str(args.workers),
+                   "--page-window", str(args.page_window)]
+        if args.log: command += ["--log", args.log]
+        if args.keep_db: command.append("--keep-db")
+        print(f"그룹 인원 {members}명 실행 중...", file=sys.stderr)
+        output = subprocess.run(command, cwd=CRAWLING, check=True, stdout=subprocess.PIPE, text=True).stdout
+        rows.extend(json.loads(output.strip().splitlines()[-1])["cycles"])
+    report(rows)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"revision": git_revision(), "options": vars(args), "results": rows}, f, ensure_ascii=False, indent=2)
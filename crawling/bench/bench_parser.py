@@ -0,0 +1,106 @@
+"""
+BOJ 페이지 파서 마이크로 벤치마크.
+info/boj_parser의 결과가 기존 문자열 자르기 방식과 같은지 확인하고,
+두 방식의 파싱 시간과 파싱 중 최대 추가 메모리(페이지 복사본 포함)를 비교한다.
+
+    cd crawling
+    python -m bench.bench_parser [반복 횟수]
+"""
+import os, sys, timeit, datetime, tracemalloc
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from info import boj_parser
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+# 기존 구현 (info/user_info.py, info/group_rank.py의 문자열 자르기 방식)
+def legacy_status(html, last_solution=0):
+    table = html.find('status-table">') + 14
+    table = html.find('<tbody>', table) + 7
+    table_end = html.find('</tbody>', table)
+    html = html[table:table_end].split('</tr>')
+    html.pop()
+
+    data = []
+    for line in html:
+        try:
+            elements = line.split('</td>')
+            if not "result-ac" in elements[3]: continue
+            solution = int(elements[0].split('<td>')[1])
+            if solution <= last_solution: break
+            problem_id = int(elements[2].split('" rel')[0].replace('<td><a href="/problem/', ''))
+            time_value = datetime.datetime.strptime(elements[8].split('" data-timestamp')[0].split('title="')[1], "%Y-%m-%d %H:%M:%S")
+            data.append((solution, problem_id, time_value))
+        except:
+            continue
+    return data
+
+def legacy_ranklist(html):
+    def get_user(html):
+        arr = html.replace('<td>', '').split('</td>')
+        name_first = arr[1].find('/user/') + 6
+        name_end = arr[1].find('">', name_first)
+        name = arr[1][name_first:name_end]
+        correct_first = arr[3].find('>') + 1
+        correct = arr[3].replace('</a>', '')[correct_first:]
+        submission_first = arr[4].find('>') + 1
+        submission = arr[4].replace('</a>', '')[submission_first:]
+        return (name, int(correct), int(submission))
+
+    problem_first = html.find('id="ranklist"') + 13
+    problem_first = html.find('<tbody>', problem_first) + 7
+    problem_end = html.find('</tbody>', problem_first)
+    html = html[problem_first:problem_end].replace('<tr>', '')
+    arr = html.split('</tr>')
+    arr.pop()
+    return [get_user(e) for e in arr]
+
+def legacy_problem_list(html):
+    problem_list = html.find('<div class="problem-list">') + 26
+    problem_list_end = html.find("</div>", problem_list)
+    html = html[problem_list:problem_list_end].replace('<a href="/problem/', '').replace('" class="">', ' ').replace('</a>', ' ')
+    return sorted(set(map(int, html.split())))
+
+def parser_status(html, last_solution=0):
+    data = []
+    for row in boj_parser.status_rows(html):
+        if row.result != "ac": continue
+        if row.solution <= last_solution: break
+        data.append((row.solution, row.problem, row.submitted_at))
+    return data
+
+def parser_ranklist(html):
+    return [tuple(row) for row in boj_parser.ranklist_rows(html)]
+
+def parser_problem_list(html):
+    return sorted(set(boj_parser.solved_problem_ids(html)))
+
+CASES = [
+    ("status", "status.html", legacy_status, parser_status),
+    ("ranklist", "ranklist.html", legacy_ranklist, parser_ranklist),
+    ("problem-list", "user.html", legacy_problem_list, parser_problem_list),
+]
+
+def peak_memory(func, html) -> int:
+    tracemalloc.start()
+    func(html)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def main(number: int) -> None:
+    print(f"{'page':<14}{'size (KB)':>10}{'legacy (us)':>13}{'parser (us)':>13}{'legacy peak (KB)':>18}{'parser peak (KB)':>18}  same")
+    for name, file, legacy, parser in CASES:
+        html = fixture(file)
+        same = legacy(html) == parser(html)
+        legacy_time = timeit.timeit(lambda: legacy(html), number=number) / number * 1e6
+        parser_time = timeit.timeit(lambda: parser(html), number=number) / number * 1e6
+        legacy_peak = peak_memory(legacy, html) / 1024
+        parser_peak = peak_memory(parser, html) / 1024
+        print(f"{name:<14}{len(html.encode()) / 1024:>10.1f}{legacy_time:>13.1f}{parser_time:>13.1f}{legacy_peak:>18.1f}{parser_peak:>18.1f}  {same}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
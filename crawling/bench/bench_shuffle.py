@@ -0,0 +1,89 @@
+"""
+추첨 셔플 알고리즘 검증 및 벤치마크 (score/shuffle.py).
+
+1. v1이 기존 구현(전역 random.seed + random.shuffle)과 모든 시드에서 같은 결과를 내는지 확인한다.
+2. v1과 v2가 같은 입력/시드에서 순서가 같은지 비교한다. (v2는 의도적으로 다른 순서를 만든다)
+3. 두 알고리즘의 1등 확률이 가중치 비율(w_i / W)과 맞는지 확인한다.
+4. 사용자 수와 점수를 키워 가며 시간과 최대 메모리를 비교한다.
+
+    cd crawling
+    python -m bench.bench_shuffle [사용자 수] [최대 점수]
+"""
+import os, sys, time, random, tracemalloc
+from collections import Counter
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from score import shuffle
+
+def legacy_shuffle(ranks, seed):
+    weighted_user = []
+    for name, score in ranks:
+        weighted_user.extend([(name, score)] * int(score ** 1.05))
+    random.seed(seed)
+    random.shuffle(weighted_user)
+    shuffled = list(dict.fromkeys(weighted_user))
+    return [(name, score) for name, score in shuffled]
+
+def make_ranks(users: int, max_score: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    ranks = [(user_id, rng.randint(1, max_score)) for user_id in range(1, users + 1)]
+    ranks.sort(key=lambda x: (-x[1], x[0]))
+    return ranks
+
+def check_legacy(trials: int = 200) -> None:
+    same = 0
+    for i in range(trials):
+        ranks = make_ranks(30, 40, i)
+        seed = f"seed-{202600 + i % 12}-{sum(s for _, s in ranks)}"
+        same += shuffle.shuffle_v1(ranks, seed) == legacy_shuffle(ranks, seed)
+    print(f"[v1 == 기존 구현] {same}/{trials} 시드에서 동일")
+
+def compare_versions(trials: int = 200) -> None:
+    same_order = same_first = 0
+    for i in range(trials):
+        ranks = make_ranks(30, 40, i)
+        seed = f"seed-{i}"
+        v1 = shuffle.shuffle_v1(ranks, seed)
+        v2 = shuffle.shuffle_v2(ranks, seed)
+        same_order += v1 == v2
+        same_first += v1[0] == v2[0]
+    print(f"[v1 vs v2] 전체 순서 동일 {same_order}/{trials}, 1등 동일 {same_first}/{trials} (의도적으로 다른 순서)")
+    ranks = [(1, 1), (2, 1)]
+    print(f"[v1 vs v2] 단일 사용자 입력은 항상 동일: {shuffle.shuffle_v1(ranks[:1], 's') == shuffle.shuffle_v2(ranks[:1], 's')}")
+
+def check_distribution(trials: int = 20000) -> None:
+    ranks = [(1, 30), (2, 10), (3, 5), (4, 1)]
+    total = sum(shuffle.weight(s) for _, s in ranks)
+    first = {1: Counter(), 2: Counter()}
+    for i in range(trials):
+        for version in (1, 2):
+            first[version][shuffle.ALGORITHMS[version](ranks, f"dist-{i}")[0][0]] += 1
+    print("[1등 확률] user  기대값     v1       v2")
+    for user_id, score in ranks:
+        expected = shuffle.weight(score) / total
+        print(f"           {user_id:<5}{expected:>7.3f}{first[1][user_id] / trials:>9.3f}{first[2][user_id] / trials:>9.3f}")
+
+def measure(func, ranks) -> tuple:
+    tracemalloc.start()
+    started = time.perf_counter()
+    func(ranks, "bench")
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+def benchmark(users: int, max_score: int) -> None:
+    print(f"[벤치마크] users  max_score  weight_sum    v1 (s)  v1 peak (MB)    v2 (s)  v2 peak (MB)")
+    for n, m in ((1000, 100), (users, max_score // 10), (users, max_score)):
+        ranks = make_ranks(n, m)
+        weight_sum = sum(shuffle.weight(s) for _, s in ranks)
+        v1_time, v1_peak = measure(shuffle.shuffle_v1, ranks)
+        v2_time, v2_peak = measure(shuffle.shuffle_v2, ranks)
+        print(f"           {n:<7}{m:<11}{weight_sum:<12}{v1_time:>8.3f}{v1_peak / 2**20:>14.1f}{v2_time:>10.3f}{v2_peak / 2**20:>14.1f}")
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    max_score = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    check_legacy()
+    compare_versions()
+    check_distribution()
+    benchmark(users, max_score)
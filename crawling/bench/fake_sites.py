@@ -0,0 +1,249 @@
+"""
+벤치마크용 BOJ/solved.ac 대역 서버.
+합성 사용자 N명의 그룹 랭킹, 사용자 정보, 채점 현황 페이지와 solved.ac 티어 JSON을 만들어 돌려준다.
+사용자별 제출 수만 기억하고 페이지는 요청마다 계산하므로 10,000명도 메모리를 거의 쓰지 않는다.
+
+    cd crawling
+    python -m bench.fake_sites --members 1000 --latency 0.02 --rate 50
+
+시작하면 "BOJ <url> SOLVEDAC <url>" 한 줄을 출력한다.
+POST /_advance?fraction=0.1&solves=3  일부 사용자에게 새 제출을 추가한다. (다음 크롤링 주기 준비)
+GET  /_stats                          경로별 요청 수와 429 응답 수
+"""
+import sys, json, time, random, argparse, datetime, threading
+from html import escape
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STATUS_PAGE_ROWS = 20   # BOJ 채점 현황 한 페이지의 행 수
+RANKLIST_PAGE_ROWS = 100
+PROBLEMS = 30000        # 문제 번호 범위: 1000 ~ 1000 + PROBLEMS - 1
+GROUP_ID = 1
+ACTIVE = ' class="active"'
+
+class Members:
+    """
+    사용자 i의 k번째 제출(0부터)은 번호, 문제, 결과, 시각이 (i, k)로 정해진다. 짝수 번째 제출만 맞았다.
+    """
+    def __init__(self, members: int, seed: int = 0) -> None:
+        rng = random.Random(seed)
+        self.names = [f'bench{i:05d}' for i in range(members)]
+        self.initial = [rng.randint(2, 400) for _ in range(members)]
+        self.submissions = list(self.initial)
+        self.started = datetime.datetime.now().replace(microsecond=0)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.version = 0
+        self.lock = threading.Lock()
+        self.__ranklist = (None, [])
+
+    def solution(self, i: int, k: int) -> int:
+        return (i + 1) * 1000000 + k
+
+    def problem(self, i: int, k: int) -> int:
+        return 1000 + (i * 7919 + (k // 2) * 104729) % PROBLEMS
+
+    def time(self, i: int, k: int) -> datetime.datetime:
+        # 처음부터 있던 제출은 1분 간격으로 과거에, 새 제출은 서버 시작 뒤 1초 간격으로 둔다.
+        if k < self.initial[i]:
+            return self.started - datetime.timedelta(minutes=self.initial[i] - k)
+        return self.started + datetime.timedelta(seconds=k - self.initial[i] + 1)
+
+    def corrects(self, i: int) -> int:
+        return len({self.problem(i, k) for k in range(0, self.submissions[i], 2)})
+
+    def advance(self, fraction: float, solves: int, seed: int) -> int:
+        rng = random.Random(seed)
+        chosen = rng.sample(range(len(self.names)), int(len(self.names) * fraction))
+        with self.lock:
+            for i in chosen:
+                self.submissions[i] += solves * 2
+            self.version += 1
+        return len(chosen)
+
+    def ranklist(self) -> list:
+        with self.lock:
+            if self.__ranklist[0] != self.version:
+                rows = [(self.names[i], self.corrects(i), self.submissions[i]) for i in range(len(self.names))]
+                rows.sort(key=lambda row: (-row[1], row[2], row[0]))
+                self.__ranklist = (self.version, rows)
+            return self.__ranklist[1]
+
+def ranklist_page(members: Members, page: int, window: int = 0) -> str:
+    rows = members.ranklist()
+    pages = max(1, (len(rows) + RANKLIST_PAGE_ROWS - 1) // RANKLIST_PAGE_ROWS)
+    if page < 1 or page > pages:
+        return '<html><body><div class="error-v1-title">404</div></body></html>'
+    body = []
+    for rank, (name, corrects, submissions) in enumerate(rows[(page - 1) * RANKLIST_PAGE_ROWS:page * RANKLIST_PAGE_ROWS], (page - 1) * RANKLIST_PAGE_ROWS + 1):
+        body.append(
+            f'<tr><td>{rank}</td><td><a href="/user/{name}">{name}</a></td><td></td>'
+            f'<td><a href="/status?user_id={name}&amp;result_id=4">{corrects}</a></td>'
+            f'<td><a href="/status?user_id={name}">{submissions}</a></td>'
+            f'<td>{corrects / submissions * 100:.3f}%</td></tr>')
+    # window가 있으면 BOJ처럼 현재 페이지가 속한 window개 묶음의 링크만 보여 준다.
+    first, last = 1, pages
+    if window > 0:
+        first = (page - 1) // window * window + 1
+        last = min(pages, first + window - 1)
+    links = ''.join(
+        f'<li{ACTIVE if p == page else ""}><a href="/group/ranklist/{GROUP_ID}/{p}">{p}</a></li>'
+        for p in range(first, last + 1))
+    return (
+        '<html><body><div class="table-responsive"><table class="table table-striped table-bordered" id="ranklist">'
+        '<thead><tr><th>등수</th><th>아이디</th><th>상태 메시지</th><th>맞은 문제</th><th>제출</th><th>정답 비율</th></tr></thead>'
+        f'<tbody>{"".join(body)}</tbody></table></div>'
+        f'<div class="text-center"><ul class="pagination">{links}</ul></div></body></html>')
+
+def status_page(members: Members, name: str, top: int) -> str:
+    i = members.index.get(name)
+    body = []
+    if i is not None:
+        k = members.submissions[i] - 1
+        if top is not None:
+            k = min(k, top - members.solution(i, 0))
+        for k in range(k, max(-1, k - STATUS_PAGE_ROWS), -1):
+            solution, problem = members.solution(i, k), members.problem(i, k)
+            result = ("ac", "맞았습니다!!") if k % 2 == 0 else ("wa", "틀렸습니다")
+            submitted_at = members.time(i, k)
+            body.append(
+                f'<tr id="solution-{solution}"><td>{solution}</td><td><a href="/user/{name}" title="">{name}</a></td>'
+                f'<td><a href="/problem/{problem}" rel="tooltip" class="problem_title tooltip-click">{problem}</a></td>'
+                f'<td class="result"><span class="result-text result-{result[0]}" data-color="{result[0]}">{result[1]}</span></td>'
+                f'<td class="memory">2020<span class="kb-text"></span></td><td class="time">0<span class="ms-text"></span></td>'
+                f'<td><a href="/source/{solution}">C++17</a></td><td>300<span class="b-text"></span></td>'
+                f'<td><a href="" rel="tooltip" data-placement="top" title="{submitted_at:%Y-%m-%d %H:%M:%S}" '
+                f'data-timestamp="{int(submitted_at.timestamp())}" class="real-time-update show-date">0분 전</a></td></tr>')
+    return (
+        '<html><body><div class="table-responsive"><table class="table table-striped table-bordered" id="status-table">'
+        '<thead><tr><th>제출 번호</th><th>아이디</th><th>문제</th><th>결과</th><th>메모리</th><th>시간</th><th>언어</th><th>코드 길이</th><th>제출한 시간</th></tr></thead>'
+        f'<tbody>{"".join(body)}</tbody></table></div></body></html>')
+
+def user_page(members: Members, name: str) -> str:
+    i = members.index.get(name)
+    if i is None:
+        return '<html><body><div class="error-v1-title">404</div></body></html>'
+    problems = sorted({members.problem(i, k) for k in range(0, members.submissions[i], 2)})
+    links = ' '.join(f'<a href="/problem/{problem}" class="">{problem}</a>' for problem in problems)
+    return (
+        f'<html><body><h1>{escape(name)}</h1><div class="panel-heading"><h3 class="panel-title">맞은 문제</h3></div>'
+        f'<div class="panel-body"><div class="problem-list">{links} </div></div></body></html>')
+
+class RateLimit:
+    """
+    초당 rate개의 토큰 버킷. rate가 0이면 제한하지 않는다.
+    """
+    def __init__(self, rate: float) -> None:
+        self.__rate = rate
+        self.__tokens = rate
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def allow(self) -> bool:
+        if self.__rate <= 0: return True
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.__rate, self.__tokens + (now - self.__updated) * self.__rate)
+            self.__updated = now
+            if self.__tokens < 1: return False
+            self.__tokens -= 1
+            return True
+
+class Stats:
+    def __init__(self) -> None:
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def add(self, key: str) -> None:
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+def handler(site: str, members: Members, latency: float, limit: RateLimit, stats: Stats, window: int):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def __send(self, status: int, body: str, content_type: str, headers: dict = None) -> None:
+            data = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            if url.path != "/_advance":
+                return self.__send(404, "", "text/plain")
+            changed = members.advance(float(query.get("fraction", "0.1")), int(query.get("solves", "3")), int(query.get("seed", members.version)))
+            self.__send(200, json.dumps({"changed": changed}), "application/json")
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            if url.path == "/_stats":
+                with stats.lock:
+                    return self.__send(200, json.dumps(stats.counts), "application/json")
+
+            kind = f'{site}:{url.path if site == "solvedac" else url.path.split("/")[1]}'
+            if not limit.allow():
+                stats.add(f'{kind}:429')
+                return self.__send(429, "", "text/plain", {"Retry-After": "1"})
+            stats.add(kind)
+            if latency > 0: time.sleep(latency)
+
+            if site == "boj":
+                parts = url.path.strip("/").split("/")
+                if parts[:2] == ["group", "ranklist"] and len(parts) == 4:
+                    return self.__send(200, ranklist_page(members, int(parts[3]), window), "text/html; charset=utf-8")
+                if parts[0] == "user" and len(parts) == 2:
+                    return self.__send(200, user_page(members, parts[1]), "text/html; charset=utf-8")
+                if parts[0] == "status":
+                    top = int(query["top"]) if "top" in query else None
+                    return self.__send(200, status_page(members, query.get("user_id", ""), top), "text/html; charset=utf-8")
+            else:
+                if url.path == "/api/v3/problem/show":
+                    problem = int(query["problemId"])
+                    return self.__send(200, json.dumps({"problemId": problem, "level": problem % 31}), "application/json")
+                if url.path == "/api/v3/problem/lookup":
+                    problems = [int(p) for p in query.get("problemIds", "").split(",") if p]
+                    return self.__send(200, json.dumps([{"problemId": p, "level": p % 31} for p in problems]), "application/json")
+                if url.path == "/api/v3/user/show":
+                    i = members.index.get(query.get("handle"))
+                    if i is None: return self.__send(404, "", "application/json")
+                    return self.__send(200, json.dumps({"handle": query["handle"], "tier": i % 31}), "application/json")
+            self.__send(404, "", "text/plain")
+
+        def log_message(self, format, *args):
+            pass
+    return Handler
+
+def serve(members: Members, host: str, port: int, site: str, latency: float, rate: float, stats: Stats, window: int = 0) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), handler(site, members, latency, RateLimit(rate), stats, window))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name=f'fake-{site}', daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BOJ/solved.ac 대역 서버")
+    parser.add_argument("--members", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.0, help="요청마다 더할 지연(초)")
+    parser.add_argument("--rate", type=float, default=0.0, help="사이트별 초당 허용 요청 수 (0이면 제한 없음), 넘으면 429")
+    parser.add_argument("--boj-host", default="127.0.0.1")
+    parser.add_argument("--solvedac-host", default="127.0.0.2", help="다른 호스트로 보이도록 BOJ와 다른 루프백 주소를 쓴다.")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--page-window", type=int, default=0, help="랭킹 페이지 목록에 보여 줄 링크 수 (0이면 모든 페이지)")
+    args = parser.parse_args()
+
+    members = Members(args.members, args.seed)
+    stats = Stats()
+    boj = serve(members, args.boj_host, args.port, "boj", args.latency, args.rate, stats, args.page_window)
+    solvedac = serve(members, args.solvedac_host, args.port, "solvedac", args.latency, args.rate, stats)
+    print(f'BOJ http://{args.boj_host}:{boj.server_address[1]} SOLVEDAC http://{args.solvedac_host}:{solvedac.server_address[1]}', flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    sys.exit(0)
@@ -1,47 +1,48 @@
-import requests, os
+import requests, os, time
+from concurrent.futures import ThreadPoolExecutor, wait
+from info import client
 from repository import db
 from dotenv import load_dotenv
 from logger import msg, warning, error, debug
+import metrics
 load_dotenv()
 
 SITE_URL = os.getenv("SITE_URL")
+# 웹훅 동시 전송 수, 웹훅 하나의 타임아웃(초), 전체 전송 마감 시간(초)
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", "8"))
+BROADCAST_TIMEOUT = float(os.getenv("BROADCAST_TIMEOUT", "10"))
+BROADCAST_DEADLINE = float(os.getenv("BROADCAST_DEADLINE", "15"))
 
-def get_message (lotto: list[tuple]) : 
+def get_message (lotto: list[tuple]) :
     message = [
         "추첨 결과가 바뀌었습니다.",
         f"{SITE_URL} 에서 자세히 확인하세요!",
         ""
     ]
 
-    for i in range(min(10, len(lotto))):
-        message.append(f"{i+1}. `{db.get_name_by_id(lotto[i][0])}`: {lotto[i][1]} 문제")
+    top = lotto[:10]
+    names = db.get_names_by_ids([user_id for user_id, _ in top])
+    for i in range(len(top)):
+        message.append(f"{i+1}. `{names.get(top[i][0])}`: {top[i][1]} 문제")
     # message.append("") # padding / deprecated / discord remove last empty line
 
     return message;
 
-def broadcast(lotto : list[tuple]):
-    message = get_message(lotto)
-
-    header = {
-        "Content-Type": "application/json",
-    }
-
-    content = {
-        "content": "\n".join(message)
-    }
-
-    urls = db.get_all_urls()
-    rejected_urls = []  # 비정상적인 웹훅 URL들을 저장할 리스트
+def __send(id: int, url: str, content: dict) -> tuple:
+    """
+    웹훅 하나에 메시지를 보낸다. 작업 스레드에서 실행되며 DB에 접근하지 않는다.
+    Returns:
+        tuple: (id, url, 거부 사유 또는 None, 소요 시간(초))
+    """
+    started = time.perf_counter()
+    reason = None
+    try:
+        response = client.post(url, json=content, timeout=BROADCAST_TIMEOUT)
 
-    for id, url in urls:
-        try:
-            response = requests.post(url, headers=header, json=content, timeout=10)
-            
-            # HTTP 상태 코드가 2xx가 아니거나 특정 에러 응답인 경우
-            if response.status_code < 200 or response.status_code >= 300:
-                rejected_urls.append((id, url, f"HTTP_{response.status_code}"))
-                continue
-                
+        # HTTP 상태 코드가 2xx가 아니거나 특정 에러 응답인 경우
+        if response.status_code < 200 or response.status_code >= 300:
+            reason = f"HTTP_{response.status_code}"
+        else:
             # Discord API 에러 응답 확인
             try:
                 discord_response = response.json()
@@ -50,24 +51,75 @@ def broadcast(lotto : list[tuple]):
                     # 50027: Cannot send messages to this user
                     # 50013: Missing Permissions
                     # 10003: Unknown Channel
-                    rejected_urls.append((id, url, f"Discord_{discord_response['code']}"))
-                    continue
+                    reason = f"Discord_{discord_response['code']}"
             except (ValueError, KeyError):
                 # JSON 파싱 실패는 정상적인 경우일 수 있음
                 pass
-                
-        except requests.exceptions.Timeout:
-            warning(f"웹훅 타임아웃 (ID: {id}, URL: {url})")
-            rejected_urls.append((id, url, "Timeout"))
-        except requests.exceptions.ConnectionError:
-            warning(f"웹훅 연결 실패 (ID: {id}, URL: {url})")
-            rejected_urls.append((id, url, "ConnectionError"))
-        except requests.exceptions.RequestException as e:
-            error(f"웹훅 요청 실패 (ID: {id}, URL: {url}): {str(e)}")
-            rejected_urls.append((id, url, f"RequestError_{str(e)}"))
-        except Exception as e:
-            error(f"웹훅 예상치 못한 에러 (ID: {id}, URL: {url}): {str(e)}")
-            rejected_urls.append((id, url, f"UnexpectedError_{str(e)}"))
+
+    except requests.exceptions.Timeout:
+        warning(f"웹훅 타임아웃 (ID: {id}, URL: {url})")
+        reason = "Timeout"
+    except requests.exceptions.ConnectionError:
+        warning(f"웹훅 연결 실패 (ID: {id}, URL: {url})")
+        reason = "ConnectionError"
+    except requests.exceptions.RequestException as e:
+        error(f"웹훅 요청 실패 (ID: {id}, URL: {url}): {str(e)}")
+        reason = f"RequestError_{str(e)}"
+    except Exception as e:
+        error(f"웹훅 예상치 못한 에러 (ID: {id}, URL: {url}): {str(e)}")
+        reason = f"UnexpectedError_{str(e)}"
+    return id, url, reason, time.perf_counter() - started
+
+def get_content(lotto: list[tuple]) -> dict:
+    return {
+        "content": "\n".join(get_message(lotto))
+    }
+
+def deliver(content: dict) -> tuple:
+    """
+    모든 웹훅에 content를 동시에 보내고, 비정상적인 웹훅은 무시하도록 DB에 저장한다.
+    Returns:
+        tuple: (성공한 웹훅 수, 거부된 웹훅 수, 마감 시간을 넘긴 웹훅 수)
+    """
+    with metrics.stage("broadcast"):
+        delivered, rejected, late = __deliver(content)
+    metrics.inc("webhooks_total", delivered, {"result": "delivered"}, "웹훅 전송 결과")
+    metrics.inc("webhooks_total", rejected, {"result": "rejected"}, "웹훅 전송 결과")
+    metrics.inc("webhooks_total", late, {"result": "late"}, "웹훅 전송 결과")
+    return delivered, rejected, late
+
+def __deliver(content: dict) -> tuple:
+    urls = db.get_all_urls()
+    if not urls:
+        msg("전송할 웹훅이 없습니다.")
+        return 0, 0, 0
+
+    rejected_urls = []  # 비정상적인 웹훅 URL들을 저장할 리스트
+    started = time.perf_counter()
+
+    # 웹훅을 동시에 보내고 전체 마감 시간까지만 기다린다.
+    # 전송 시간은 웹훅 수의 합이 아니라 가장 느린 웹훅(최대 BROADCAST_DEADLINE초)에 맞춰진다.
+    executor = ThreadPoolExecutor(max_workers=max(1, min(BROADCAST_WORKERS, len(urls))))
+    futures = {executor.submit(__send, id, url, content): (id, url) for id, url in urls}
+    done, not_done = wait(futures, timeout=BROADCAST_DEADLINE)
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    delivered = 0
+    for future in done:
+        id, url, reason, elapsed = future.result()
+        debug(f"웹훅 전송 (ID: {id}): {reason or 'OK'} {elapsed * 1000:.0f}ms")
+        if reason is None:
+            delivered += 1
+        else:
+            rejected_urls.append((id, url, reason))
+
+    # 마감 시간 안에 끝나지 않은 웹훅은 느린 것일 뿐 잘못된 웹훅이라고 볼 수 없으므로 무시 처리하지 않는다.
+    for future in not_done:
+        id, url = futures[future]
+        warning(f"웹훅 전송 마감 시간 초과 (ID: {id}, URL: {url})")
+
+    msg(f"웹훅 전송 결과: 성공 {delivered}개, 실패 {len(rejected_urls)}개, 마감 초과 {len(not_done)}개 "
+        f"({time.perf_counter() - started:.2f}초)")
 
     # 비정상적인 웹훅 URL들을 DB에 저장하여 앞으로 무시하도록 함
     if rejected_urls:
@@ -77,5 +129,9 @@ def broadcast(lotto : list[tuple]):
             msg("비정상적인 웹훅 URL들이 DB에 저장되었습니다.")
         except Exception as e:
             error(f"DB 저장 실패: {str(e)}")
-    else:
-        msg("모든 웹훅이 정상적으로 전송되었습니다.")
\ No newline at end of file
+    elif not not_done:
+        msg("모든 웹훅이 정상적으로 전송되었습니다.")
+    return delivered, len(rejected_urls), len(not_done)
+
+def broadcast(lotto : list[tuple]):
+    deliver(get_content(lotto))
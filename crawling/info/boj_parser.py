@@ -0,0 +1,127 @@
+import re, datetime, hashlib
+from typing import Iterator, NamedTuple
+
+class ParseError(ValueError):
+    """BOJ 페이지 구조가 예상과 달라 파싱할 수 없을 때 발생"""
+
+class StatusRow(NamedTuple):
+    solution: int
+    problem: int
+    result: str            # "ac", "wa", "tle", ... (result-xx 클래스)
+    submitted_at: datetime.datetime
+
+class RankRow(NamedTuple):
+    name: str
+    corrects: int
+    submissions: int
+
+# 행 하나(<tr> 안쪽)에 대해 match한다. 칸 순서: 제출 번호, 아이디, 문제, 결과, 메모리, 시간, 언어, 코드 길이, 제출한 시간
+_STATUS_ROW = re.compile(
+    r'\s*<td[^>]*>\s*(\d+)\s*</td>'
+    r'.*?href="/problem/(\d+)"'
+    r'.*?\bresult-(?!text\b)(\w+)'
+    r'.*?title="(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)"',
+    re.S)
+# 칸 순서: 등수, 아이디, 상태 메시지, 맞은 문제, 제출, 정답 비율
+_RANK_ROW = re.compile(
+    r'\s*<td[^>]*>.*?</td>'
+    r'\s*<td[^>]*>.*?href="/user/([^"/]+)".*?</td>'
+    r'\s*<td[^>]*>.*?</td>'
+    r'\s*<td[^>]*>\s*(?:<a\b[^>]*>)?\s*(\d+)\s*(?:</a>)?\s*</td>'
+    r'\s*<td[^>]*>\s*(?:<a\b[^>]*>)?\s*(\d+)\s*(?:</a>)?\s*</td>',
+    re.S)
+_PROBLEM = re.compile(r'href="/problem/(\d+)"')
+_RANKLIST_PAGE = re.compile(r'href="/group/ranklist/\d+/(\d+)"')
+
+def _table_body(html: str, marker: str) -> tuple:
+    """
+    marker 뒤에 나오는 첫 번째 <tbody>의 (시작, 끝) 위치. 문자열을 자르지 않고 위치만 돌려준다.
+    """
+    table = html.find(marker)
+    if table == -1:
+        raise ParseError(f'{marker}를 찾을 수 없습니다.')
+    start = html.find('<tbody>', table)
+    end = html.find('</tbody>', start)
+    if start == -1 or end == -1:
+        raise ParseError(f'{marker}의 <tbody>를 찾을 수 없습니다.')
+    return start + 7, end
+
+def _rows(html: str, start: int, end: int) -> Iterator[tuple]:
+    """
+    [start, end) 구간에 있는 <tr ...>내용</tr>들의 내용 위치 (시작, 끝)를 차례로 돌려준다.
+    """
+    pos = html.find('<tr', start, end)
+    while pos != -1:
+        content = html.find('>', pos, end) + 1
+        close = html.find('</tr>', content, end) if content else -1
+        if close == -1:
+            raise ParseError(f'</tr>로 닫히지 않았습니다: {html[pos:pos + 200]}')
+        yield content, close
+        pos = html.find('<tr', close, end)
+
+def _match(pattern: re.Pattern, html: str, row: tuple, what: str) -> re.Match:
+    found = pattern.match(html, *row)
+    if found is None:
+        raise ParseError(f'{what} 행을 해석할 수 없습니다: {html[row[0]:row[1]][:200]}')
+    return found
+
+def status_rows(html: str) -> Iterator[StatusRow]:
+    """
+    채점 현황(/status) 페이지의 행을 위에서부터(최신 제출부터) 하나씩 돌려준다.
+    Raises:
+        ParseError: 표나 행의 구조가 예상과 다를 때
+    """
+    start, end = _table_body(html, 'id="status-table"')
+    for row in _rows(html, start, end):
+        found = _match(_STATUS_ROW, html, row, '채점 현황')
+        yield StatusRow(
+            int(found.group(1)),
+            int(found.group(2)),
+            found.group(3),
+            datetime.datetime.fromisoformat(found.group(4)),
+        )
+
+def ranklist_rows(html: str) -> Iterator[RankRow]:
+    """
+    그룹 랭킹 페이지의 행을 하나씩 돌려준다.
+    Raises:
+        ParseError: 표나 행의 구조가 예상과 다를 때
+    """
+    start, end = _table_body(html, 'id="ranklist"')
+    for row in _rows(html, start, end):
+        found = _match(_RANK_ROW, html, row, '랭킹')
+        yield RankRow(found.group(1), int(found.group(2)), int(found.group(3)))
+
+def ranklist_digest(html: str) -> str:
+    """
+    그룹 랭킹 표(<tbody>)의 해시. 광고나 시각처럼 표 밖에서 바뀌는 내용은 무시한다.
+    Raises:
+        ParseError: 표를 찾을 수 없을 때
+    """
+    start, end = _table_body(html, 'id="ranklist"')
+    return hashlib.sha1(html[start:end].encode()).hexdigest()
+
+def ranklist_page_count(html: str) -> int | None:
+    """
+    그룹 랭킹 페이지 아래의 페이지 목록에서 마지막 페이지 번호를 찾는다.
+    Returns:
+        int | None: 페이지 수, 페이지 목록이 없으면 None
+    """
+    start = html.find('class="pagination"')
+    if start == -1: return None
+    end = html.find('</ul>', start)
+    pages = [int(found.group(1)) for found in _RANKLIST_PAGE.finditer(html, start, end if end != -1 else len(html))]
+    return max(pages) if pages else None
+
+def solved_problem_ids(html: str) -> Iterator[int]:
+    """
+    사용자 정보 페이지의 '맞은 문제' 목록에서 문제 번호를 하나씩 돌려준다.
+    Raises:
+        ParseError: 문제 목록을 찾을 수 없을 때
+    """
+    start = html.find('<div class="problem-list">')
+    if start == -1:
+        raise ParseError('problem-list를 찾을 수 없습니다.')
+    end = html.find('</div>', start)
+    for found in _PROBLEM.finditer(html, start, end):
+        yield int(found.group(1))
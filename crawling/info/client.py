@@ -0,0 +1,81 @@
+import os, time, requests
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from info import throttle
+import metrics
+from dotenv import load_dotenv
+load_dotenv()
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.5"))  # 0.5, 1, 2, ... 초 간격으로 재시도
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))  # 호스트별로 유지할 연결 수
+
+# 호스트(접미사)별 기본 헤더
+HOST_HEADERS = {
+    "acmicpc.net": {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36",
+    },
+    "solved.ac": {
+        "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36",
+        "Accept": "application/json",
+        "Accept-Language": "ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7",
+        "Referer": "https://solved.ac/",
+        "Origin": "https://solved.ac",
+        "x-solvedac-language": "ko",
+    },
+}
+
+def __new_session() -> requests.Session:
+    # GET 등 멱등 요청만 재시도한다. (웹훅 POST는 중복 전송될 수 있어 재시도하지 않음)
+    retry = Retry(
+        total=HTTP_RETRIES,
+        backoff_factor=HTTP_BACKOFF,
+        status_forcelist=(429, 500, 502, 503, 504),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+__session = __new_session()
+
+def __headers(host: str) -> dict:
+    for suffix, headers in HOST_HEADERS.items():
+        if host == suffix or host.endswith("." + suffix):
+            return headers
+    return {}
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    공용 세션으로 요청을 보낸다. 호스트별 연결을 재사용하고, 동시 요청 수는 throttle로 제한한다.
+    Args:
+        method (str): HTTP 메서드
+        url (str): 요청할 URL
+        kwargs: requests.Session.request 인자. headers는 호스트 기본 헤더에 덮어쓴다.
+    """
+    host = urlsplit(url).hostname or ""
+    headers = dict(__headers(host))
+    headers.update(kwargs.pop("headers", None) or {})
+    kwargs.setdefault("timeout", (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+    with throttle.host_slot(url):
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = __session.request(method, url, headers=headers, **kwargs)
+            status = str(response.status_code)
+            return response
+        finally:
+            metrics.observe("http_request_seconds", time.perf_counter() - started, {"host": host}, "호스트별 HTTP 응답 시간 (재시도 포함)")
+            metrics.inc("http_requests_total", 1, {"host": host, "status": status}, "호스트별 HTTP 요청 수")
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
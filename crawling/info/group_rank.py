@@ -1,58 +1,123 @@
-import requests, os, time
+import os
+from typing import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from info import client, boj_parser
+import metrics
 from dotenv import load_dotenv
 load_dotenv()
 
 GROUP_RANK = os.getenv("GROUP_RANK")
+# 랭킹이 바뀌지 않아도 이 주기(크롤링 횟수)마다 한 번은 전체 크롤링을 한다. (관리자 수정 등 반영)
+RANKLIST_FORCE_EVERY = int(os.getenv("RANKLIST_FORCE_EVERY", "12"))
 
-def __get_user(html):
-    arr = html.replace('<td>', '').split('</td>')
-    name_first = arr[1].find('/user/') + 6
-    name_end = arr[1].find('">', name_first)
-    name = arr[1][name_first:name_end]
+# 첫 페이지 이후의 페이지를 동시에 받을 스레드 수 (실제 동시 요청 수는 info/throttle의 호스트별 제한을 따른다)
+RANKLIST_WORKERS = int(os.getenv("RANKLIST_WORKERS", "4"))
+RANKLIST_PAGE_SIZE = 100
 
-    correct = arr[3]
-    correct_first = arr[3].find('>') + 1
-    correct = arr[3].replace('</a>', '')[correct_first:]
-
-    submission = arr[4]
-    submission_first = arr[4].find('>') + 1
-    submission = arr[4].replace('</a>', '')[submission_first:]
-    return (name, int(correct), int(submission))
+__pages = {}            # {page: (ETag, Last-Modified, 표 해시, 사람 목록, 페이지 수)}
+__unchanged_cycles = 0  # 마지막 전체 크롤링 이후 변화 없이 건너뛴 횟수
 
 def get_group_member():
-    return __get_group_member(1)
-
-def __get_group_member(page=1):
-    if page >= 3: return []
-    
-    response = requests.get(
-        url = f'{GROUP_RANK}/{page}',
-        headers = {
-            "User-Agent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36'
-        },
-    )
+    return __collect()[0]
 
-    html = response.text
-    if html.find('error-v1-title') != -1:
-        return []
-    
-    problem_first = html.find('id="ranklist"') + 13 # 13 letters
-    problem_first = html.find('<tbody>', problem_first) + 7 # 7 letters
-    problem_end = html.find('</tbody>', problem_first)
-    html = html[problem_first:problem_end].replace('<tr>', '')
-    arr = html.split('</tr>')
-    arr.pop()
+def fetch_group_member() -> tuple:
+    """
+    그룹 랭킹을 가져오고 지난 번과 달라졌는지 알려준다.
+    ETag/Last-Modified가 있으면 조건부 요청을 보내고, 없으면 랭킹 표의 해시로 비교한다.
+    Returns:
+        tuple: (people, changed). changed가 False이면 이번 주기의 크롤링을 건너뛰어도 된다.
+    """
+    global __unchanged_cycles
+    people, changed = __collect()
+    if changed or __unchanged_cycles + 1 >= RANKLIST_FORCE_EVERY:
+        __unchanged_cycles = 0
+        return people, True
+    __unchanged_cycles += 1
+    return people, False
+
+def invalidate() -> None:
+    """
+    저장한 랭킹 지문을 지워 다음 fetch_group_member가 변화가 있다고 판단하게 한다.
+    """
+    __pages.clear()
+
+def stream_group_member() -> Iterator[tuple]:
+    """
+    그룹 랭킹을 페이지 순서대로 돌려준다. 페이지 목록에 보이는 마지막 페이지까지는 동시에 받고, 앞 페이지부터 도착하는 대로 내보낸다.
+    페이지 목록이 앞쪽 일부만 보여 주면 받은 페이지의 목록에서 더 뒤의 번호를 알아내 이어서 받는다.
+    목록이 없거나 끝까지 받았는데 마지막 페이지가 100명으로 가득 차 있으면(그 사이 인원이 늘었을 수 있다)
+    100명이 안 되는 페이지나 없는 페이지가 나올 때까지 한 페이지씩 더 받는다.
+    Yields:
+        tuple: (page, people, changed). 지난 번보다 페이지 수가 줄었으면 마지막에 (없어진 첫 페이지, [], True)를 내보낸다.
+    """
+    people, changed, pages = __get_page(1)
+    if people is None: return
+    yield 1, people, changed
+
+    last, known = 1, pages or 1
+    with ThreadPoolExecutor(max_workers=RANKLIST_WORKERS) as executor:
+        while people is not None:
+            if known > last:
+                batch = range(last + 1, known + 1)
+            elif len(people) == RANKLIST_PAGE_SIZE:
+                batch = range(last + 1, last + 2)
+            else:
+                break
+            futures = [executor.submit(__get_page, page) for page in batch]
+            for page, future in zip(batch, futures):
+                people, changed, pages = future.result()
+                if people is None: break  # 마지막 페이지를 지났거나 받는 도중 페이지 수가 줄었다.
+                last = page
+                known = max(known, pages or 0)
+                yield page, people, changed
+    if __drop_pages_after(last):
+        yield last + 1, [], True
 
+def __collect() -> tuple:
     people = []
-    for e in arr:
-        people.append(__get_user(e))
+    changed = False
+    for _, rows, page_changed in stream_group_member():
+        people.extend(rows)
+        changed = changed or page_changed
+    return people, changed
+
+def __drop_pages_after(page: int) -> bool:
+    stale = [p for p in __pages if p > page]
+    for p in stale:
+        del __pages[p]
+    return len(stale) > 0
+
+def __get_page(page: int) -> tuple:
+    """
+    Returns:
+        tuple: (people, changed, 페이지 수), 없는 페이지면 people이 None
+    """
+    url = f'{GROUP_RANK}/{page}'
+    cached = __pages.get(page)
+    headers = {}
+    if cached is not None:
+        if cached[0]: headers['If-None-Match'] = cached[0]
+        if cached[1]: headers['If-Modified-Since'] = cached[1]
+    response = client.get(url, headers=headers)
+
+    if response.status_code == 304 and cached is not None:
+        return cached[3], False, cached[4]
+
+    html = response.text
+    if html.find('error-v1-title') != -1:
+        return None, False, None
 
-    if len(people) % 100 == 0:
-        time.sleep(0.1)
-        people = people + __get_group_member(page+1)
-    return people
+    with metrics.stage("parse"):
+        digest = boj_parser.ranklist_digest(html)
+        pages = boj_parser.ranklist_page_count(html)
+        if cached is not None and cached[2] == digest:
+            people, changed = cached[3], False
+        else:
+            people, changed = list(boj_parser.ranklist_rows(html)), True
+    __pages[page] = (response.headers.get('ETag'), response.headers.get('Last-Modified'), digest, people, pages)
+    return people, changed, pages
 
 # people = get_group_member()
 # print(len(people))
 # print(*people, sep='\n')
-# (name, corrects, submissions)
\ No newline at end of file
+# (name, corrects, submissions)
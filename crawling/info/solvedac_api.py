@@ -1,69 +1,84 @@
 import os
-import requests
+from info import client
+from logger import debug, warning
 from dotenv import load_dotenv
 
 load_dotenv()
 PROBLEM_TIER_API = os.getenv("PROBLEM_TIER_API")
 USER_TIER_API = os.getenv("USER_TIER_API")
+# 여러 문제를 한 번에 조회하는 API. 지정하지 않으면 PROBLEM_TIER_API(.../problem/show)에서 유추한다.
+PROBLEM_LOOKUP_API = os.getenv("PROBLEM_LOOKUP_API") or (PROBLEM_TIER_API or "").rsplit("/", 1)[0] + "/lookup"
+PROBLEM_LOOKUP_BATCH = int(os.getenv("PROBLEM_LOOKUP_BATCH", "100"))
 
 def problem_tier(problem_id):
     try:
-        print(f"Requesting problem tier for ID: {problem_id}", flush=True)
-        
-        response = requests.get(
-            url=f"{PROBLEM_TIER_API}?problemId={problem_id}",
-            headers={
-                "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36",
-                "Accept": "application/json",
-                "Accept-Language": "ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7",
-                "Referer": "https://solved.ac/",
-                "Origin": "https://solved.ac",
-                "x-solvedac-language": "ko",
-            },
-            timeout=30
-        )
-        
-        print(f"Status Code: {response.status_code}", flush=True)
-        
+        url = f"{PROBLEM_TIER_API}?problemId={problem_id}"
+        response = client.get(url)
+
         if response.status_code == 200:
             data = response.json()
-            print(f"Response: {data}", flush=True)
+            debug(f"문제 티어 조회: {problem_id} -> {data.get('level')}")
             return data.get("level")
         else:
-            print(f"Error: Status {response.status_code}", flush=True)
+            warning(f"문제 티어 조회 실패 ({problem_id}): HTTP {response.status_code}")
+            return None
+
+    except Exception as e:
+        warning(f"문제 티어 조회 실패 ({problem_id}): {e}")
+        return None
+
+def problem_tiers(problem_ids) -> dict:
+    """
+    여러 문제의 티어를 PROBLEM_LOOKUP_BATCH개씩 묶어서 조회한다.
+    묶음 요청이 실패하면 그 묶음은 problem_tier로 하나씩 조회한다.
+    Args:
+        problem_ids (iterable of int): 문제 번호들
+    Returns:
+        dict: {문제 번호: 티어}, 조회하지 못한 문제는 None
+    """
+    problem_ids = list(dict.fromkeys(problem_ids))
+    tiers = {}
+    for i in range(0, len(problem_ids), PROBLEM_LOOKUP_BATCH):
+        chunk = problem_ids[i:i + PROBLEM_LOOKUP_BATCH]
+        found = __lookup(chunk)
+        if found is None:
+            for problem_id in chunk:
+                tiers[problem_id] = problem_tier(problem_id)
+            continue
+        for problem_id in chunk:
+            tiers[problem_id] = found.get(problem_id)
+    return tiers
+
+def __lookup(problem_ids):
+    try:
+        url = f"{PROBLEM_LOOKUP_API}?problemIds={','.join(map(str, problem_ids))}"
+        response = client.get(url)
+
+        if response.status_code == 200:
+            debug(f"문제 티어 {len(problem_ids)}개를 한 번에 조회했습니다.")
+            return {problem["problemId"]: problem.get("level") for problem in response.json()}
+        else:
+            warning(f"문제 티어 묶음 조회 실패 ({len(problem_ids)}개): HTTP {response.status_code}")
             return None
-            
+
     except Exception as e:
-        print(f"Exception: {e}", flush=True)
+        warning(f"문제 티어 묶음 조회 실패 ({len(problem_ids)}개): {e}")
         return None
 
 def user_tier(username):
     try:
-        print(f"Requesting user tier for: {username}", flush=True)
-        
-        response = requests.get(
-            url=f"{USER_TIER_API}?handle={username}",
-            headers={
-                "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36",
-                "Accept": "application/json",
-                "Accept-Language": "ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7",
-                "Referer": "https://solved.ac/",
-                "Origin": "https://solved.ac",
-            },
-            timeout=30
-        )
-        
-        print(f"Status Code: {response.status_code}", flush=True)
-        
+        url = f"{USER_TIER_API}?handle={username}"
+        response = client.get(url)
+
         if response.status_code == 200:
             data = response.json()
-            print(f"Response: {data}", flush=True)
+            debug(f"사용자 티어 조회: {username} -> {data.get('tier')}")
             return data.get("tier")
         else:
-            print(f"Error: Status {response.status_code}", flush=True)
+            warning(f"사용자 티어 조회 실패 ({username}): HTTP {response.status_code}")
             # solved.ac 미가입자는 티어를 마스터로 조정하여 계산한다.
             return 31
-            
+
     except Exception as e:
-        print(f"Exception: {e}", flush=True)
+        warning(f"사용자 티어 조회 실패 ({username}): {e}")
         return None
\ No newline at end of file
@@ -0,0 +1,45 @@
+import os, threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+load_dotenv()
+
+# 호스트별 동시 요청 수 제한. 예) HOST_CONCURRENCY="www.acmicpc.net=2,solved.ac=4"
+HOST_CONCURRENCY = os.getenv("HOST_CONCURRENCY", "")
+DEFAULT_HOST_CONCURRENCY = int(os.getenv("DEFAULT_HOST_CONCURRENCY", "2"))
+# 같은 호스트에 요청하는 크롤러 프로세스 수. 호스트별 제한을 나눠 가져 전체 동시 요청 수를 지킨다.
+CRAWL_SHARDS = int(os.getenv("CRAWL_SHARDS", "1"))
+
+# 웹훅은 모두 같은 디스코드 호스트로 나가므로 기본값을 따로 둔다. HOST_CONCURRENCY로 덮어쓸 수 있다.
+__limits = {
+    "discord.com": 8,
+    "discordapp.com": 8,
+}
+for item in HOST_CONCURRENCY.split(","):
+    if "=" not in item: continue
+    host, limit = item.split("=", 1)
+    __limits[host.strip()] = int(limit)
+
+__semaphores = {}
+__lock = threading.Lock()
+
+def host_limit(host: str) -> int:
+    return max(1, __limits.get(host, DEFAULT_HOST_CONCURRENCY) // CRAWL_SHARDS)
+
+def __semaphore(host: str) -> threading.BoundedSemaphore:
+    with __lock:
+        if host not in __semaphores:
+            __semaphores[host] = threading.BoundedSemaphore(max(1, host_limit(host)))
+        return __semaphores[host]
+
+@contextmanager
+def host_slot(url: str):
+    """
+    url의 호스트에 대한 동시 요청 슬롯을 하나 점유한다.
+    슬롯이 모두 사용 중이면 빌 때까지 기다린다.
+    Args:
+        url (str): 요청할 URL
+    """
+    semaphore = __semaphore(urlsplit(url).hostname or "")
+    with semaphore:
+        yield
@@ -1,4 +1,6 @@
-import requests, os, datetime, time
+import os, datetime, time
+from info import client, boj_parser
+import metrics
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -8,41 +10,22 @@ USER_SUBMISSION = os.getenv("USER_SUBMISSION")
 # for init
 def solved_problems(username, key):
     if key != "init": raise ValueError("key가 올바르지 않음")
-    response = requests.get(
-        url = f'{USER_INFO}/{username}',
-        headers = {
-            "User-Agent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36'
-        },
-    )
+    url = f'{USER_INFO}/{username}'
+    response = client.get(url)
 
-    html = response.text
-
-    problem_list = html.find('<div class="problem-list">') + 26 # 26 letters
-    problem_list_end = html.find("</div>", problem_list)
-    html = html[problem_list:problem_list_end].replace('<a href="/problem/', '').replace('" class="">', ' ').replace('</a>', ' ')
-    problems = list(set(map(int,html.split())))
-    return problems
+    with metrics.stage("parse"):
+        return list(set(boj_parser.solved_problem_ids(response.text)))
 
 def last_solution(username, key):
     if key != "init": raise ValueError("key가 올바르지 않음")
-    response = requests.get(
-        url = f'{USER_SUBMISSION}user_id={username}',
-        headers = {
-            "User-Agent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36'
-        },
-    )
-
-    html = response.text
-
-    table = html.find('status-table">') + 14
-    table = html.find('<tbody>', table) + 7
-    table_end = html.find('</tbody>', table)
-    html = html[table:table_end].split('</tr>')
+    url = f'{USER_SUBMISSION}user_id={username}'
+    response = client.get(url)
 
-    line = html[0]
-    elements = line.split('</td>')
-    solution = int(elements[0].split('<td>')[1])
-    return solution
+    with metrics.stage("parse"):
+        row = next(boj_parser.status_rows(response.text), None)
+    if row is None:
+        raise boj_parser.ParseError(f'{username}님의 제출 기록이 없습니다.')
+    return row.solution
 
 # time = "2024-08-25 19:52:59"
 # time = datetime.datetime.strptime(time, "%Y-%m-%d %H:%M:%S")
@@ -52,53 +35,46 @@ def str2datetime(s='epoch'):
     except:
         return datetime.datetime.fromtimestamp(0) # epoch time
 
-called = 0
 def recent_solved_problems(username, last_solution):
-    global called
-    called = 0
-    return __recent_solved_problems(username, last_solution)
-
-def __recent_solved_problems(username, last_solution, query=''):
-    global called
-    called += 1
-    if called > 4:
-        return []
-    response = requests.get(
-        url = f'{USER_SUBMISSION}user_id={username}&{query}',
-        headers = {
-            "User-Agent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36'
-        },
-    )
-
-    html = response.text
-
-    table = html.find('status-table">') + 14
-    table = html.find('<tbody>', table) + 7
-    table_end = html.find('</tbody>', table)
-    html = html[table:table_end].split('</tr>')
-    html.pop()
-
+    """
+    last_solution 이후의 맞은 제출을 모두 가져온다. 페이지 수 제한이 없으므로 크롤링 주기에서는 solved_pages를 쓴다.
+    """
     data = []
-    solution = 0
-    flag = 1
-    for line in html:
-        try:
-            elements = line.split('</td>')
-            if not "result-ac" in elements[3]: continue # check if it is AC
-            solution = int(elements[0].split('<td>')[1])
-            if solution <= last_solution:
-                flag = 0
-                break
-            problem_id = int(elements[2].split('" rel')[0].replace('<td><a href="/problem/', ''))
-            time_value = str2datetime(elements[8].split('" data-timestamp')[0].split('title="')[1])
-            data.append((solution, problem_id, time_value))
-        except:
-            continue
-    if flag:
-        time.sleep(0.1)
-        data = data + __recent_solved_problems(username, last_solution, 'top=' + str(solution-1))
+    for rows, _ in solved_pages(username, last_solution):
+        data.extend(rows)
     return data
 
+def solved_pages(username, last_solution, top=None):
+    """
+    채점 현황을 한 페이지씩 내려가며 last_solution보다 큰 맞은 제출을 돌려준다.
+    last_solution 이하의 제출을 만나거나 더 이상 제출이 없으면 멈춘다. 필요한 만큼만 읽고 그만둘 수 있다.
+    Args:
+        top (int): 이 제출 번호부터 읽는다. None이면 가장 최근 제출부터 읽는다.
+    Yields:
+        tuple: (이 페이지의 맞은 제출 (solution, problem_id, datetime) 리스트, 다음 페이지의 top 또는 끝까지 읽었으면 None)
+    """
+    while True:
+        query = '' if top is None else 'top=' + str(top)
+        url = f'{USER_SUBMISSION}user_id={username}&{query}'
+        response = client.get(url)
+
+        data = []
+        solution = None
+        done = False
+        with metrics.stage("parse"):
+            for row in boj_parser.status_rows(response.text):
+                solution = row.solution
+                if solution <= last_solution:
+                    done = True
+                    break
+                if row.result != "ac": continue # check if it is AC
+                data.append((row.solution, row.problem, row.submitted_at))
+        if solution is None or solution - 1 <= last_solution: done = True # 더 이상 읽을 제출 기록이 없음
+        top = None if done else solution - 1
+        yield data, top
+        if done: return
+        time.sleep(0.1)
+
 # www.acmicpc.net/status?user_id=tjgus1668&result_id=4&top=90716579
 # res = __recent_solved_problems("tjgus1668", 90581335,"top=90716579")
 # print(*res)
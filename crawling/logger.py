@@ -1,6 +1,8 @@
-import sys
+import os, sys, json, time, queue, atexit, threading
 from enum import Enum
 import datetime, pytz
+from dotenv import load_dotenv
+load_dotenv()
 
 class LogLevel(Enum):
     MESSAGE = 1
@@ -27,23 +29,56 @@ class ConsoleAndFileWriter:
         sys.stdout.flush()
         self.__file.flush()
 
+# 출력 형식(text: 사람이 읽는 한 줄, json: 구조화된 JSON 한 줄), 비동기 출력 여부,
+# 비동기 출력에서 한 번에 모아 쓸 최대 줄 수와 최대 대기 시간(초)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_ASYNC = os.getenv("LOG_ASYNC", "0") == "1"
+LOG_BATCH = int(os.getenv("LOG_BATCH", "256"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "0.5"))
+
 __timezone = pytz.timezone('Asia/Seoul')
 __cur_level = LogLevel.MESSAGE
+__threshold = __cur_level.value
 __writer = sys.stdout
 __color = True
+__format = LOG_FORMAT
+
+__queue = None      # 비동기 출력이 켜져 있으면 (level, 시각, 메시지, 필드) 레코드가 쌓이는 큐
+__thread = None
+__lock = threading.Lock()  # 큐에 넣기와 비동기 출력 시작/종료를 한 번에 하나씩 하게 한다.
+__stamp = (None, "")  # (초 단위 시각, 서식을 입힌 시각) - 같은 초 안에서는 다시 서식을 입히지 않는다.
 
 def set_level(level: LogLevel) -> None:
-    global __cur_level
+    global __cur_level, __threshold
     __cur_level = level
+    __threshold = level.value
 
 def set_writer(writer) -> None:
     global __writer, __color
+    flush()
     __writer = writer
     __color = True if __writer == sys.stdout else False
 
-
-def __prefix(level: LogLevel) -> str:
-    cur_time = datetime.datetime.now(__timezone).replace(tzinfo=None).strftime("%Y-%m-%d %H:%M:%S")
+def set_color(color: bool) -> None:
+    global __color
+    __color = color
+
+def set_format(format: str) -> None:
+    """
+    Args:
+        format (str): text 또는 json
+    """
+    global __format
+    __format = format
+
+def __time(created: float) -> str:
+    global __stamp
+    second = int(created)
+    if __stamp[0] != second:
+        __stamp = (second, datetime.datetime.fromtimestamp(second, __timezone).strftime("%Y-%m-%d %H:%M:%S"))
+    return __stamp[1]
+
+def __prefix(level: LogLevel, cur_time: str) -> str:
     if not __color:
         return f"[{level.name} {cur_time}]".ljust(30)
     if level == LogLevel.MESSAGE:
@@ -57,22 +92,119 @@ def __prefix(level: LogLevel) -> str:
     else:
         return f"[UNKNOWN {cur_time}]".ljust(40)
 
-def __put(level: LogLevel, s: str) -> None:
-    if __cur_level.value >= level.value:
-        __writer.write(__prefix(level) + s + "\n")
+def __line(level: LogLevel, created: float, s: str, fields: dict) -> str:
+    if __format == "json":
+        record = {"time": __time(created), "level": level.name, "msg": s}
+        record.update(fields)
+        return json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    return __prefix(level, __time(created)) + s + "\n"
+
+def __drain(records: queue.SimpleQueue) -> None:
+    """
+    비동기 출력 스레드. 큐에 쌓인 레코드를 최대 LOG_BATCH개씩 모아 한 번에 쓰고 flush한다.
+    threading.Event가 오면 그때까지 모은 것을 쓰고 알려 주고, None이 오면 쓰고 끝낸다.
+    """
+    stop = False
+    while not stop:
+        record = records.get()
+        lines = []
+        done = None
+        deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+        while True:
+            if record is None:
+                stop = True
+                break
+            if isinstance(record, threading.Event):
+                done = record
+                break
+            lines.append(__line(*record))
+            if len(lines) >= LOG_BATCH: break
+            try:
+                record = records.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+        if lines:
+            __writer.write("".join(lines))
+            __writer.flush()
+        if done is not None: done.set()
+
+def start_async() -> None:
+    """
+    로그를 백그라운드 스레드에서 모아 쓰도록 바꾼다. 호출한 스레드는 큐에 넣기만 한다.
+    """
+    global __queue, __thread
+    with __lock:
+        if __thread is not None: return
+        __queue = queue.SimpleQueue()
+        __thread = threading.Thread(target=__drain, args=(__queue,), name="logger", daemon=True)
+        __thread.start()
+
+def flush() -> None:
+    """
+    지금까지 남긴 로그가 모두 쓰일 때까지 기다린다. 비동기 출력은 계속된다.
+    """
+    with __lock:
+        records = __queue
+        if records is not None:
+            done = threading.Event()
+            records.put(done)
+    if records is None:
         __writer.flush()
-
-def msg(s: str) -> None: __put(LogLevel.MESSAGE, s)
-
-def debug(s: str) -> None: __put(LogLevel.DEBUG, s)
-
-def warning(s: str) -> None: __put(LogLevel.WARNING, s)
-
-def error(s: str) -> None: __put(LogLevel.ERROR, s)
+        return
+    done.wait()
+
+def stop() -> None:
+    """
+    남은 로그를 모두 쓰고 동기 출력으로 돌아간다.
+    """
+    global __queue, __thread
+    with __lock:
+        if __thread is None: return
+        records, thread = __queue, __thread
+        __queue = __thread = None
+        records.put(None)
+    thread.join()
+
+def __after_fork() -> None:
+    """
+    fork한 자식 프로세스(multiprocessing 작업자)에는 출력 스레드가 따라오지 않으므로 동기 출력으로 돌아간다.
+    부모의 큐에 남아 있던 레코드는 부모가 쓴다. fork 순간 다른 스레드가 잡고 있었을 수 있는 잠금도 새로 만든다.
+    """
+    global __queue, __thread, __lock
+    __lock = threading.Lock()
+    __queue = None
+    __thread = None
+
+def __put(level: LogLevel, s: str, fields: dict) -> None:
+    if __threshold < level.value:
+        return
+    created = time.time()
+    if __queue is not None:
+        # stop()이 종료 표시를 넣은 뒤에 레코드를 넣지 않도록 잠금 안에서 다시 확인한다.
+        with __lock:
+            if __queue is not None:
+                __queue.put((level, created, s, fields))
+                return
+    __writer.write(__line(level, created, s, fields))
+    __writer.flush()
+
+# fields는 JSON 형식일 때 함께 기록할 구조화된 값이다. (예: user, problem, stage, duration)
+def msg(s: str, **fields) -> None: __put(LogLevel.MESSAGE, s, fields)
+
+def debug(s: str, **fields) -> None: __put(LogLevel.DEBUG, s, fields)
+
+def warning(s: str, **fields) -> None: __put(LogLevel.WARNING, s, fields)
+
+def error(s: str, **fields) -> None: __put(LogLevel.ERROR, s, fields)
+
+atexit.register(stop)
+os.register_at_fork(after_in_child=__after_fork)
+if LOG_ASYNC:
+    start_async()
 
 if __name__ == "__main__":
     set_level(LogLevel.DEBUG)
     msg("This is message")
     debug("This is debug")
     warning("This is warning")
-    error("This is error")
\ No newline at end of file
+    error("This is error")
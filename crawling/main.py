@@ -1,73 +1,185 @@
-import time, schedule, os, sys
+import time, os, sys
 from info import group_rank, user_info, solvedac_api
 from repository import service
-from score import solvedac
-import broadcast, logger
+from score import solvedac, work_queue, onboarding
+import outbox, scheduler, logger, metrics
 from logger import msg, warning, error, debug, LogLevel
 import datetime
 
 logger.set_level(LogLevel.DEBUG)
 pre_lotto = []
+pre_month = None
+pre_fingerprint = None  # 마지막 추첨 직후의 service.get_ranking_fingerprint()
+
+# 동시에 크롤링할 사용자 수. 1이면 기존처럼 한 명씩 처리한다.
+CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS", "1"))
+# 알림 전송 작업자 실행 방식. thread/process: 크롤러가 함께 실행, none: `python outbox.py`로 따로 실행
+OUTBOX_WORKER = os.getenv("OUTBOX_WORKER", "thread")
+# 새 멤버 초기화 작업자 실행 방식. thread/process: 크롤러가 함께 실행, none: `python -m score.onboarding`으로 따로 실행
+ONBOARDING_WORKER = os.getenv("ONBOARDING_WORKER", "thread")
+# 크롤링 주기(초), 시작 시각에 더할 최대 무작위 지연(초), 주기당 시간 예산(초, 0이면 제한 없음)
+CRAWL_INTERVAL = float(os.getenv("CRAWL_INTERVAL", "300"))
+CRAWL_JITTER = float(os.getenv("CRAWL_JITTER", "0"))
+CRAWL_BUDGET = float(os.getenv("CRAWL_BUDGET", "0"))
+# 활동 중인 사용자를 따로 확인하는 주기(초, 0이면 끔), 활동 점수 기준, 한 번에 확인할 최대 사용자 수(= 요청 예산)
+HOT_INTERVAL = float(os.getenv("HOT_INTERVAL", "60"))
+HOT_THRESHOLD = float(os.getenv("HOT_THRESHOLD", "0.5"))
+HOT_PROBES = int(os.getenv("HOT_PROBES", "3"))
+# standalone: 혼자 크롤링, coordinator: 작업 큐에 사용자를 나눠 주고 모두 끝나면 추첨, worker: 작업 큐만 처리
+CRAWL_ROLE = os.getenv("CRAWL_ROLE", "standalone")
 
 def init():
     global pre_lotto
-    service.open_db()
-    scores = service.get_bias()
-    ranks = service.get_score_and_rank(list(scores.items()))
-    filtered_ranks = service.filter_ignored(ranks)
-    pre_lotto = service.get_shuffle(filtered_ranks)
-    service.close_db()
-
-def update_bias():
-    global pre_lotto
+    with service.session():
+        solvedac.load_tiers()
+        solvedac.load_activity()
+        scores = service.get_bias()
+        ranks = service.get_score_and_rank(list(scores.items()))
+        filtered_ranks = service.filter_ignored(ranks)
+        pre_lotto = service.get_shuffle(filtered_ranks)
+
+def update_bias(deadline: float = None):
+    global pre_month
     msg("크롤링 시작...")
-    service.open_db()
     date_time = datetime.datetime.now()
 
     #추후에 크롤링 서버를 분리해서 처리 가능
-    people = group_rank.get_group_member()
-    solvedac.load_db()
-    for name, corrects, submissions in people:
-        solvedac.do_crawling(name, corrects, submissions)
-        # time.sleep(0.3)
-
-    service.update_bias()
-
-    scores = service.get_bias()
-    ranks = service.get_score_and_rank(list(scores.items()))
-    filtered_ranks = service.filter_ignored(ranks)
-    lotto: list[tuple] = service.get_shuffle(filtered_ranks)
-    if pre_lotto != lotto:
-        msg("추첨 결과가 바뀌어 디스코드에 알림을 보냅니다.")
-        pre_lotto = lotto
-
-        service.save_ranking(lotto, date_time)
-        broadcast.broadcast(lotto)
+    with metrics.stage("ranklist"):
+        people, changed = group_rank.fetch_group_member()
+    # 달이 바뀌면 랭킹이 그대로여도 이번 달 점수로 다시 추첨해야 한다.
+    # 채점 현황을 다 읽지 못한 사용자(solvedac.cursors)가 있으면 랭킹이 그대로여도 이어서 읽는다.
+    if not changed and pre_month == date_time.month and not solvedac.cursors:
+        msg("그룹 랭킹 변화가 없어 이번 크롤링을 건너뜁니다.")
+        return
+    pre_month = date_time.month
+
+    try:
+        crawl(people, date_time, deadline)
+    except Exception:
+        # 실패한 주기의 랭킹을 기준으로 다음 주기를 건너뛰지 않도록 지문을 지운다.
+        group_rank.invalidate()
+        raise
+    msg("크롤링 완료!")
+
+def crawl(people: list, date_time: datetime.datetime, deadline: float = None):
+    with service.session():
+        solvedac.load_db()
+        if CRAWL_ROLE == "coordinator":
+            __crawl_sharded(people, date_time, deadline)
+        else:
+            __crawl(people, date_time, deadline)
+
+def __crawl_sharded(people: list, date_time: datetime.datetime, deadline: float = None):
+    """
+    갱신할 사용자를 작업 큐에 넣고, 직접 처리하면서 모든 작업자가 끝내기를 기다린 뒤 추첨한다.
+    """
+    started = time.perf_counter()
+    cycle_id, published = work_queue.publish(solvedac.activity.order(people, datetime.datetime.now()), datetime.datetime.now())
+    msg(f"작업 큐에 {published}명을 넣었습니다. (주기 {cycle_id})")
+    left = published
+    while left > 0:
+        if deadline is not None and time.monotonic() >= deadline:
+            warning(f"주기 시간 예산을 넘겨 남은 {left}명을 기다리지 않고 추첨합니다.")
+            group_rank.invalidate()
+            break
+        if work_queue.work_once(CRAWL_WORKERS) == 0:
+            time.sleep(work_queue.CRAWL_QUEUE_POLL)
+        left = work_queue.remaining(cycle_id)
+    msg(f"사용자 크롤링 소요 시간: {time.perf_counter() - started:.2f}초 (작업 큐)")
+    # 다른 작업자가 남긴 구간도 다음 주기를 건너뛸지 정할 때 보이도록 다시 읽는다.
+    with service.transaction():
+        solvedac.load_cursors()
+
+    rank(date_time)
+
+def __crawl(people: list, date_time: datetime.datetime, deadline: float = None):
+    started = time.perf_counter()
+    fetched_time, skipped = solvedac.crawl_all(people, CRAWL_WORKERS, deadline)
+    if skipped:
+        # 미룬 사용자가 있으므로 랭킹이 그대로여도 다음 주기를 건너뛰지 않는다.
+        group_rank.invalidate()
+    elapsed = time.perf_counter() - started
+    if CRAWL_WORKERS <= 1:
+        msg(f"사용자 크롤링 소요 시간: {elapsed:.2f}초 (직렬)")
     else:
-        msg("추첨 결과 변화가 없어 디스코드 알림을 보내지 않습니다.")
+        speedup = fetched_time / elapsed if elapsed > 0 else 1
+        msg(f"사용자 크롤링 소요 시간: {elapsed:.2f}초 (동시 {CRAWL_WORKERS}명, 직렬 예상 {fetched_time:.2f}초, {speedup:.1f}배)")
+    with service.transaction():
+        solvedac.save_tiers()
 
+    rank(date_time)
 
-    service.db_commit()
-    service.close_db()
-    msg("크롤링 완료!")
+def rank(date_time: datetime.datetime):
+    """
+    이번 달 점수를 다시 계산하고 추첨 결과가 바뀌었으면 저장한 뒤 알림을 기록한다.
+    점수 기록, 제외된 사용자, 달이 모두 지난 추첨 때와 같으면 아무것도 다시 계산하지 않는다.
+    """
+    global pre_lotto, pre_fingerprint
+    with metrics.stage("ranking"), service.transaction():
+        # 추첨이 쓰는 값은 모두 같은 트랜잭션에서 읽으므로 처음 읽은 지문이 이번 추첨의 지문이다.
+        fingerprint = service.get_ranking_fingerprint()
+        if fingerprint == pre_fingerprint:
+            msg("점수 변화가 없어 추첨을 건너뜁니다.")
+            metrics.inc("ranking_skipped_total", 1, None, "점수 변화가 없어 건너뛴 추첨 수")
+            return
+        service.update_bias()
+
+        scores = service.get_bias()
+        ranks = service.get_score_and_rank(list(scores.items()))
+        filtered_ranks = service.filter_ignored(ranks)
+        lotto: list[tuple] = service.get_shuffle(filtered_ranks)
+        if pre_lotto != lotto:
+            msg("추첨 결과가 바뀌어 디스코드 알림을 아웃박스에 기록합니다.")
+            service.save_ranking(lotto, date_time)
+            outbox.enqueue(lotto, date_time)
+        else:
+            msg("추첨 결과 변화가 없어 디스코드 알림을 보내지 않습니다.")
+    # 커밋된 뒤에만 바꿔야 실패한 주기의 추첨 결과가 다음 주기에 저장되지 않고 넘어가지 않는다.
+    pre_lotto = lotto
+    pre_fingerprint = fingerprint
+
+def hot_poll(deadline: float = None):
+    """
+    전체 크롤링 사이에 최근 활동한 사용자 몇 명만 채점 현황 첫 페이지로 확인한다.
+    새로 푼 문제가 있을 때만 DB를 열어 반영하고 추첨을 다시 한다.
+    """
+    now = datetime.datetime.now()
+    names = solvedac.activity.hot(now, HOT_THRESHOLD, datetime.timedelta(seconds=HOT_INTERVAL), HOT_PROBES)
+    crawled = []
+    for name in names:
+        if deadline is not None and time.monotonic() >= deadline: break
+        result = solvedac.probe(name)
+        if result is not None: crawled.append(result)
+    if not crawled: return
 
-init()
-msg("Hello, World!")
-update_bias()
-
-schedule.every().hour.at(":00").do(update_bias)
-schedule.every().hour.at(":05").do(update_bias)
-schedule.every().hour.at(":10").do(update_bias)
-schedule.every().hour.at(":15").do(update_bias)
-schedule.every().hour.at(":20").do(update_bias)
-schedule.every().hour.at(":25").do(update_bias)
-schedule.every().hour.at(":30").do(update_bias)
-schedule.every().hour.at(":35").do(update_bias)
-schedule.every().hour.at(":40").do(update_bias)
-schedule.every().hour.at(":45").do(update_bias)
-schedule.every().hour.at(":50").do(update_bias)
-schedule.every().hour.at(":55").do(update_bias)
-
-while True:
-    schedule.run_pending()
-    time.sleep(1)
\ No newline at end of file
+    msg(f"활동 중인 사용자 {len(crawled)}명의 새 풀이를 반영합니다.")
+    with service.session():
+        solvedac.load_events()
+        for result in crawled:
+            solvedac.apply(result)
+        solvedac.flush()
+        with service.transaction():
+            solvedac.save_tiers()
+        rank(now)
+
+if __name__ == "__main__":
+    metrics.serve()
+    if CRAWL_ROLE == "worker":
+        with service.session():
+            solvedac.load_tiers()
+        work_queue.run(CRAWL_WORKERS)
+
+    if OUTBOX_WORKER != "none":
+        outbox.start(OUTBOX_WORKER)
+    if ONBOARDING_WORKER != "none":
+        onboarding.start(ONBOARDING_WORKER)
+    init()
+    msg("Hello, World!")
+
+    # 활동 중인 사용자 확인은 작업자와 같은 사용자를 동시에 처리하지 않도록 standalone에서만 한다.
+    if CRAWL_ROLE == "standalone" and 0 < HOT_INTERVAL < CRAWL_INTERVAL:
+        crawler = scheduler.Scheduler(update_bias, CRAWL_INTERVAL, CRAWL_JITTER, CRAWL_BUDGET, minor=hot_poll, minor_interval=HOT_INTERVAL)
+    else:
+        crawler = scheduler.Scheduler(update_bias, CRAWL_INTERVAL, CRAWL_JITTER, CRAWL_BUDGET)
+    crawler.run_once(time.time())
+    crawler.run_forever()
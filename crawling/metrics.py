@@ -0,0 +1,154 @@
+import os, time, json, threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dotenv import load_dotenv
+load_dotenv()
+
+# Prometheus 형식으로 지표를 내보낼 포트(0이면 끔), 주기마다 지표를 JSON 한 줄로 덧붙일 파일(비우면 끔)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_JSON = os.getenv("METRICS_JSON", "")
+
+# 히스토그램 구간(초)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+__lock = threading.Lock()
+__counters = {}     # {(이름, 레이블): 값}
+__histograms = {}   # {(이름, 레이블): [구간별 개수..., 합, 개수]}
+__help = {}         # {이름: (종류, 설명)}
+
+def __key(name: str, labels: dict) -> tuple:
+    return name, tuple(sorted((labels or {}).items()))
+
+def inc(name: str, value: float = 1, labels: dict = None, help: str = "") -> None:
+    """
+    카운터를 value만큼 늘린다.
+    """
+    key = __key(name, labels)
+    with __lock:
+        __help.setdefault(name, ("counter", help))
+        __counters[key] = __counters.get(key, 0) + value
+
+def observe(name: str, value: float, labels: dict = None, help: str = "") -> None:
+    """
+    히스토그램에 값(초)을 하나 기록한다.
+    """
+    key = __key(name, labels)
+    with __lock:
+        __help.setdefault(name, ("histogram", help))
+        histogram = __histograms.get(key)
+        if histogram is None:
+            histogram = __histograms[key] = [0] * (len(BUCKETS) + 2)
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound: histogram[i] += 1
+        histogram[-2] += value
+        histogram[-1] += 1
+
+@contextmanager
+def stage(name: str):
+    """
+    with stage("ranklist"): 블록의 소요 시간을 crawl_stage_seconds{stage=name}에 기록한다.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("crawl_stage_seconds", time.perf_counter() - started, {"stage": name}, "단계별 소요 시간")
+
+def __labels(labels: tuple, extra: tuple = ()) -> str:
+    items = labels + extra
+    if not items: return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in items) + "}"
+
+def render() -> str:
+    """
+    Returns:
+        str: Prometheus text exposition format
+    """
+    lines = []
+    with __lock:
+        for name, (kind, help) in sorted(__help.items()):
+            if help: lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (key_name, labels), value in sorted(__counters.items()):
+                    if key_name == name: lines.append(f"{name}{__labels(labels)} {value}")
+                continue
+            for (key_name, labels), histogram in sorted(__histograms.items()):
+                if key_name != name: continue
+                for bound, count in zip(BUCKETS, histogram):
+                    lines.append(f"{name}_bucket{__labels(labels, (('le', bound),))} {count}")
+                lines.append(f"{name}_bucket{__labels(labels, (('le', '+Inf'),))} {histogram[-1]}")
+                lines.append(f"{name}_sum{__labels(labels)} {histogram[-2]}")
+                lines.append(f"{name}_count{__labels(labels)} {histogram[-1]}")
+    return "\n".join(lines) + "\n"
+
+def snapshot() -> dict:
+    """
+    Returns:
+        dict: {"counters": {...}, "histograms": {...: {"sum", "count"}}}, 키는 name{label=value,...}
+    """
+    with __lock:
+        return {
+            "counters": {f"{name}{__labels(labels)}": value for (name, labels), value in __counters.items()},
+            "histograms": {
+                f"{name}{__labels(labels)}": {"sum": round(h[-2], 6), "count": h[-1]}
+                for (name, labels), h in __histograms.items()
+            },
+        }
+
+__previous = {"counters": {}, "histograms": {}}
+
+def dump_cycle(extra: dict = None) -> dict:
+    """
+    지난 호출 이후 늘어난 값을 JSON 한 줄로 METRICS_JSON 파일에 덧붙인다. (크롤링 주기가 끝날 때 호출)
+    Returns:
+        dict: 이번 주기에 늘어난 값
+    """
+    global __previous
+    current = snapshot()
+    delta = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "counters": {
+            key: value - __previous["counters"].get(key, 0)
+            for key, value in current["counters"].items()
+            if value != __previous["counters"].get(key, 0)
+        },
+        "histograms": {
+            key: {
+                "sum": round(value["sum"] - __previous["histograms"].get(key, {}).get("sum", 0), 6),
+                "count": value["count"] - __previous["histograms"].get(key, {}).get("count", 0),
+            }
+            for key, value in current["histograms"].items()
+            if value["count"] != __previous["histograms"].get(key, {}).get("count", 0)
+        },
+    }
+    if extra: delta.update(extra)
+    __previous = current
+    if METRICS_JSON:
+        with open(METRICS_JSON, "a") as file:
+            file.write(json.dumps(delta, ensure_ascii=False) + "\n")
+    return delta
+
+class __Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(port: int = METRICS_PORT):
+    """
+    /metrics를 제공하는 HTTP 서버를 데몬 스레드로 실행한다. port가 0이면 실행하지 않는다.
+    """
+    if port <= 0: return None
+    server = ThreadingHTTPServer(("0.0.0.0", port), __Handler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
@@ -0,0 +1,95 @@
+import os, time, json, datetime, threading
+from multiprocessing import Process
+from repository import db
+from dotenv import load_dotenv
+import broadcast
+from logger import msg, warning, error, debug
+load_dotenv()
+
+# 아웃박스 확인 주기(초), 최대 시도 횟수, 재시도 대기 시간(초, 시도할 때마다 두 배)
+OUTBOX_POLL = float(os.getenv("OUTBOX_POLL", "2"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_BACKOFF = float(os.getenv("OUTBOX_BACKOFF", "30"))
+# 알림 하나를 보내는 동안 다른 작업자가 가져가지 못하게 하는 시간(초). 웹훅 전체 마감 시간(BROADCAST_DEADLINE)보다 길어야 한다.
+OUTBOX_LEASE = float(os.getenv("OUTBOX_LEASE", "60"))
+
+def enqueue(lotto: list[tuple], time: datetime.datetime) -> int:
+    """
+    추첨 결과 알림을 아웃박스에 기록한다. 크롤링 트랜잭션 안에서 호출되며 디스코드를 기다리지 않는다.
+    크롤링 트랜잭션이 커밋되어야 전송 작업자에게 보인다.
+    Args:
+        lotto (list of tuples): (user_id, score)
+        time (datetime): 기록 시각
+    Returns:
+        int: 아웃박스 id
+    """
+    content = json.dumps(broadcast.get_content(lotto), ensure_ascii=False)
+    return db.add_outbox(content, time)
+
+def deliver_once(now: datetime.datetime) -> bool:
+    """
+    보낼 수 있는 가장 최근 알림 하나를 보낸다. 그보다 먼저 쌓인 알림은 보내지 않고 건너뛴다.
+    보내기 전에 sending으로 바꿔 커밋하므로 작업자가 여럿이어도 같은 알림을 두 번 보내지 않는다.
+    Returns:
+        bool: 처리한 알림이 있으면 True
+    """
+    with db.transaction():
+        row = db.claim_latest_outbox(now, now + datetime.timedelta(seconds=OUTBOX_LEASE))
+        if row is None:
+            return False
+        outbox_id, content, attempts = row
+
+        # 더 최근 알림을 다른 작업자가 가져가는 중이라 건너뛰었다면 이 알림은 이미 지난 결과다.
+        if db.has_newer_outbox(outbox_id):
+            db.mark_outbox_superseded(outbox_id)
+            return True
+        skipped = db.supersede_outbox(outbox_id)
+        if skipped:
+            msg(f"이전 알림 {skipped}개를 건너뛰고 최신 알림(ID: {outbox_id})만 보냅니다.")
+
+    try:
+        delivered, rejected, late = broadcast.deliver(json.loads(content))
+        # 아무 곳에도 보내지 못했고 마감 시간을 넘긴 웹훅이 있다면 일시적인 문제로 보고 다시 시도한다.
+        if delivered == 0 and late > 0:
+            raise TimeoutError(f"마감 시간 초과 {late}개")
+        with db.transaction():
+            db.mark_outbox_delivered(outbox_id, attempts, datetime.datetime.now())
+    except Exception as e:
+        with db.transaction():
+            if attempts >= OUTBOX_MAX_ATTEMPTS:
+                error(f"알림 전송 실패 (ID: {outbox_id}, {attempts}회 시도): {str(e)}")
+                db.mark_outbox_failed(outbox_id, attempts, str(e))
+            else:
+                next_attempt_at = datetime.datetime.now() + datetime.timedelta(seconds=OUTBOX_BACKOFF * 2 ** (attempts - 1))
+                warning(f"알림 전송 실패 (ID: {outbox_id}, {attempts}회 시도), {next_attempt_at}에 다시 시도합니다: {str(e)}")
+                db.reschedule_outbox(outbox_id, attempts, next_attempt_at, str(e))
+    return True
+
+def run() -> None:
+    """
+    아웃박스를 계속 비우는 전송 작업자. 자기 스레드(또는 프로세스)에 묶인 DB 연결을 사용한다.
+    """
+    msg("알림 전송 작업자 시작")
+    while True:
+        try:
+            with db.session():
+                while deliver_once(datetime.datetime.now()):
+                    pass
+        except Exception as e:
+            error(f"알림 전송 작업자 에러: {str(e)}")
+        time.sleep(OUTBOX_POLL)
+
+def start(mode: str = "thread"):
+    """
+    전송 작업자를 크롤러와 함께 실행한다.
+    Args:
+        mode (str): thread면 같은 프로세스의 스레드로, process면 별도 프로세스로 실행한다.
+            process는 부모의 DB 연결을 물려받지 않도록 DB를 열기 전에 호출해야 한다.
+    """
+    worker_type = Process if mode == "process" else threading.Thread
+    worker = worker_type(target=run, name="webhook-outbox", daemon=True)
+    worker.start()
+    return worker
+
+if __name__ == "__main__":
+    run()
@@ -1,4 +1,5 @@
-import os, pymysql, datetime
+import os, pymysql, datetime, threading, queue
+from contextlib import contextmanager
 from dotenv import load_dotenv
 from pymysql.connections import Connection
 from pymysql.cursors import Cursor
@@ -10,21 +11,109 @@ DB_PORT = int(os.getenv("DB_PORT"))
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_DATABASE = os.getenv("DB_DATABASE")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))          # 동시에 열어 둘 최대 연결 수
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # 빈 연결을 기다릴 최대 시간(초)
 
-conn: Connection
-__cursor: Cursor
+class ConnectionPool:
+    """
+    연결을 닫지 않고 재사용한다. 꺼낼 때 ping으로 확인해 wait_timeout이나 SSH 터널 끊김 뒤에는 다시 연결한다.
+    """
+    def __init__(self, size: int, timeout: float) -> None:
+        self.__idle = queue.LifoQueue()
+        self.__size = size
+        self.__timeout = timeout
+        self.__created = 0
+        self.__lock = threading.Lock()
+
+    def __connect(self) -> Connection:
+        return pymysql.connect(host=DB_HOST, user=DB_USER, passwd = DB_PASSWORD, db=DB_DATABASE, port=DB_PORT)
+
+    def acquire(self) -> Connection:
+        try:
+            connection = self.__idle.get_nowait()
+        except queue.Empty:
+            with self.__lock:
+                create = self.__created < self.__size
+                if create: self.__created += 1
+            if create:
+                try:
+                    return self.__connect()
+                except Exception:
+                    with self.__lock: self.__created -= 1
+                    raise
+            try:
+                connection = self.__idle.get(timeout=self.__timeout)
+            except queue.Empty:
+                raise TimeoutError(f"{self.__timeout}초 동안 사용할 수 있는 DB 연결이 없습니다.")
+        connection.ping(reconnect=True)
+        return connection
+
+    def release(self, connection: Connection) -> None:
+        self.__idle.put(connection)
+
+__pool = ConnectionPool(DB_POOL_SIZE, DB_POOL_TIMEOUT)
+__local = threading.local()  # 스레드마다 (연결, 커서)
+
+def _connection() -> Connection:
+    connection = getattr(__local, "connection", None)
+    if connection is None:
+        raise RuntimeError("이 스레드에서 open_db()를 먼저 호출해야 합니다.")
+    return connection
+
+def _cursor() -> Cursor:
+    _connection()
+    return __local.cursor
 
 def open_db():
-    global conn, __cursor
-    conn = pymysql.connect(host=DB_HOST, user=DB_USER, passwd = DB_PASSWORD, db=DB_DATABASE, port=DB_PORT)
-    __cursor = conn.cursor()
+    """
+    현재 스레드에 풀의 연결을 하나 묶는다. 이미 묶여 있으면 그대로 쓴다.
+    """
+    if getattr(__local, "connection", None) is not None: return
+    __local.connection = __pool.acquire()
+    __local.cursor = __local.connection.cursor()
 
 def close_db():
-    __cursor.close()
-    conn.close()
+    """
+    커밋하지 않은 변경은 버리고 연결을 풀에 돌려준다. (연결은 닫지 않는다)
+    """
+    connection = getattr(__local, "connection", None)
+    if connection is None: return
+    __local.connection = None
+    try:
+        __local.cursor.close()
+        connection.rollback()
+    except pymysql.err.Error:
+        # 끊긴 연결은 다음에 꺼낼 때 ping으로 다시 연결된다.
+        pass
+    __pool.release(connection)
 
 def db_commit():
-    conn.commit()
+    _connection().commit()
+
+@contextmanager
+def session():
+    """
+    with session(): 블록 동안 현재 스레드에 연결을 묶는다.
+    """
+    bound = getattr(__local, "connection", None) is not None
+    open_db()
+    try:
+        yield
+    finally:
+        if not bound: close_db()
+
+@contextmanager
+def transaction():
+    """
+    with transaction(): 블록이 끝나면 커밋하고, 예외가 나면 롤백한다.
+    """
+    connection = _connection()
+    try:
+        yield
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
 
 def get_user(username: str = '') -> tuple:
     """
@@ -36,11 +125,11 @@ def get_user(username: str = '') -> tuple:
     """
     if username == '':
         sql = "SELECT * FROM user"
-        rows = __cursor.execute(sql)
+        rows = _cursor().execute(sql)
     else:
         sql = "SELECT * FROM user WHERE name = %s"
-        rows = __cursor.execute(sql, username)
-    return __cursor.fetchall()
+        rows = _cursor().execute(sql, username)
+    return _cursor().fetchall()
 
 def update_user(username: str, corrects: int, submissions: int, solution: int, user_tier: int) -> int:
     """
@@ -55,12 +144,12 @@ def update_user(username: str, corrects: int, submissions: int, solution: int, u
         int: 변경된 행 수
     """
     sql = "SELECT name FROM user WHERE name = %s"
-    rows = __cursor.execute(sql, (username))
+    rows = _cursor().execute(sql, (username))
     if rows == 0:
         sql = "INSERT INTO user (corrects, submissions, solution, tier, name) VALUES (%s, %s, %s, %s, %s)"
     else:
         sql = "UPDATE user SET corrects = %s, submissions = %s, solution = %s, tier = %s WHERE name = %s"
-    rows = __cursor.execute(sql, (corrects, submissions, solution, user_tier, username))
+    rows = _cursor().execute(sql, (corrects, submissions, solution, user_tier, username))
     return rows
 
 # time = "2024-08-25 19:52:59"
@@ -79,8 +168,8 @@ def add_problem(name: str, problem: int, problem_tier: int, time: datetime, leve
     """
     repeatation = get_repeat_time(name, problem)
     sql = "INSERT INTO problem (name, problem, problem_tier, time, level, repeatation) VALUES (%s, %s, %s, %s, %s, %s)"
-    __cursor.execute(sql, (name, problem, problem_tier, time, level, repeatation))
-    return __cursor.lastrowid
+    _cursor().execute(sql, (name, problem, problem_tier, time, level, repeatation))
+    return _cursor().lastrowid
 
 def add_score_history(
     user_id: int,
@@ -108,32 +197,66 @@ def add_score_history(
     """
     params = (user_id, desc, bias, event_id, problem_id, created_at)
 
-    __cursor.execute(sql, params)
+    _cursor().execute(sql, params)
+
+def insert_problems(rows: list) -> list:
+    """
+    여러 풀이 기록을 INSERT 문 하나로 추가한다.
+    InnoDB는 행 수가 정해진 INSERT 하나에 AUTO_INCREMENT 값을 auto_increment_increment 간격으로 연속해 할당하므로
+    i번째 행의 id는 (첫 id + i * auto_increment_increment)이다. (복제/Galera 구성에서는 간격이 1보다 클 수 있다)
+    Args:
+        rows (list of tuples): (name, problem, problem_tier, time, level, repeatation)
+    Returns:
+        list: 각 행의 problem.id
+    """
+    placeholders = ','.join(['(%s, %s, %s, %s, %s, %s)'] * len(rows))
+    sql = f"INSERT INTO problem (name, problem, problem_tier, time, level, repeatation) VALUES {placeholders}"
+    _cursor().execute(sql, [value for row in rows for value in row])
+    first_id = _cursor().lastrowid
+    # Galera는 노드 수가 바뀌면 세션 값을 바꾸므로 INSERT마다 다시 읽는다.
+    _cursor().execute("SELECT @@SESSION.auto_increment_increment")
+    step = _cursor().fetchone()[0]
+    return [first_id + i * step for i in range(len(rows))]
+
+def add_score_histories(rows: list) -> None:
+    """
+    여러 점수 기록을 INSERT 문 하나로 추가한다.
+    Args:
+        rows (list of tuples): (user_id, desc, bias, event_id, problem_id, created_at)
+    """
+    if not rows: return
+    placeholders = ','.join(['(%s, %s, %s, %s, %s, %s)'] * len(rows))
+    sql = f"""
+        INSERT INTO score_history
+            (user_id, `desc`, bias, event_id, problem_id, created_at)
+        VALUES {placeholders}
+    """
+    _cursor().execute(sql, [value for row in rows for value in row])
 
 def get_user_id(name: str) -> int:
     sql = "SELECT id FROM user WHERE name = %s"
-    __cursor.execute(sql, name)
-    return __cursor.fetchone()[0]
+    _cursor().execute(sql, name)
+    return _cursor().fetchone()[0]
 
 def get_problem_id(problem: int) -> tuple:
     sql = "SELECT id FROM problem WHERE problem = %s"
-    __cursor.execute(sql, problem)
-    return tuple(i[0] for i in __cursor.fetchall())
+    _cursor().execute(sql, problem)
+    return tuple(i[0] for i in _cursor().fetchall())
 
 def get_problem_id_by_user(name: str, problem: int) -> tuple:
     sql = "SELECT id FROM problem WHERE problem = %s AND name = %s"
-    __cursor.execute(sql, (problem, name))
-    return tuple(i[0] for i in __cursor.fetchall())
+    _cursor().execute(sql, (problem, name))
+    return tuple(i[0] for i in _cursor().fetchall())
 
 def get_event_title(event_id: int):
     sql = "SELECT title FROM event WHERE id = %s"
-    __cursor.execute(sql, event_id)
-    return __cursor.fetchone()[0]
+    _cursor().execute(sql, event_id)
+    return _cursor().fetchone()[0]
 
 def get_ongoing_events(time: datetime.datetime) -> tuple:
     sql = "SELECT id FROM event WHERE begin < %s AND %s < end"
-    __cursor.execute(sql, (time, time))
-    return tuple(i[0] for i in __cursor.fetchall())
+    _cursor().execute(sql, (time, time))
+    return tuple(i[0] for i in _cursor().fetchall())
 
 def get_event_problems(time: datetime.datetime) -> tuple:
     ongoing_events = get_ongoing_events(time)
@@ -141,8 +264,8 @@ def get_event_problems(time: datetime.datetime) -> tuple:
 
     for event_id in ongoing_events:
         sql = 'SELECT problem FROM event_problem WHERE event_id = %s'
-        __cursor.execute(sql, event_id)
-        event_problems += tuple(i[0] for i in __cursor.fetchall())
+        _cursor().execute(sql, event_id)
+        event_problems += tuple(i[0] for i in _cursor().fetchall())
 
     return event_problems
 
@@ -152,27 +275,39 @@ def get_user_score_history(user_id: int) -> tuple:
     """
 
     sql = "SELECT * FROM score_history WHERE user_id = %s"
-    __cursor.execute(sql, user_id)
-    return __cursor.fetchall()
+    _cursor().execute(sql, user_id)
+    return _cursor().fetchall()
 
 def get_user_score_history_by_event(user_id: int, event_id: int) -> tuple:
     sql = 'SELECT * FROM score_history WHERE user_id = %s AND event_id = %s'
-    __cursor.execute(sql, (user_id, event_id))
-    return __cursor.fetchall()
+    _cursor().execute(sql, (user_id, event_id))
+    return _cursor().fetchall()
 
 def get_user_ignored(user_id: int) -> bool:
     sql = "SELECT ignored FROM user WHERE id = %s"
-    __cursor.execute(sql, user_id)
-    return __cursor.fetchone()[0]
-
-def get_score_history_by_month(time: datetime.datetime):
-    year = time.year
-    month = time.month
+    _cursor().execute(sql, user_id)
+    return _cursor().fetchone()[0]
 
-    start_date = f"{year}-{month}-01 00:00:00"
-    sql = f"SELECT user_id, bias FROM score_history WHERE created_at >= '{start_date}'" 
-    __cursor.execute(sql)
-    return __cursor.fetchall()
+def get_changed_bias(time: datetime.datetime) -> tuple:
+    """
+    이번 달 점수 합계가 user_bias_total과 다른 사용자만 가져온다.
+    Args:
+        time (datetime): 기준 시각 (해당 월 1일부터 합산)
+    Returns:
+        tuple: (user_id, 이번 달 점수 합계)
+    """
+    start_date = datetime.datetime(time.year, time.month, 1)
+    sql = """
+        SELECT m.user_id, m.total FROM (
+            SELECT user_id, SUM(bias) AS total FROM score_history
+            WHERE created_at >= %s
+            GROUP BY user_id
+        ) m
+        LEFT JOIN user_bias_total ub ON ub.user_id = m.user_id
+        WHERE COALESCE(ub.total_point, 0) <> m.total
+    """
+    _cursor().execute(sql, start_date)
+    return _cursor().fetchall()
 
 def get_problems(username: str) -> tuple:
     """
@@ -184,13 +319,13 @@ def get_problems(username: str) -> tuple:
         tuple: (id, name, problem, problem_tier, time, level, repeatation)
     """
     sql = "SELECT * FROM problem WHERE name = %s"
-    rows = __cursor.execute(sql, (username))
-    return __cursor.fetchall()
+    rows = _cursor().execute(sql, (username))
+    return _cursor().fetchall()
 
 def get_problems_by_event(event_id: int):
     sql = 'SELECT problem FROM event_problem WHERE event_id = %s'
-    __cursor.execute(sql, event_id)
-    return tuple(p[0] for p in __cursor.fetchall())
+    _cursor().execute(sql, event_id)
+    return tuple(p[0] for p in _cursor().fetchall())
 
 def get_problems_solved_today(name: str, time: datetime.datetime):
     sql = "SELECT * FROM problem WHERE name = %s AND time >= %s AND time < %s"
@@ -198,8 +333,8 @@ def get_problems_solved_today(name: str, time: datetime.datetime):
     today = datetime.datetime(time.year, time.month, time.day)
     tomorrow = time.date() + datetime.timedelta(days=1)
 
-    __cursor.execute(sql, (name, today, tomorrow))
-    return __cursor.fetchall()
+    _cursor().execute(sql, (name, today, tomorrow))
+    return _cursor().fetchall()
 
 def get_score_gained_today(user_id: int, time: datetime.datetime):
     sql = """
@@ -214,14 +349,107 @@ def get_score_gained_today(user_id: int, time: datetime.datetime):
     today = datetime.datetime(time.year, time.month, time.day)
     tomorrow = today + datetime.timedelta(days=1)
 
-    __cursor.execute(sql, (user_id, today, tomorrow))
-    return __cursor.fetchall()
+    _cursor().execute(sql, (user_id, today, tomorrow))
+    return _cursor().fetchall()
 
 def get_repeat_time(name: str, problem: int) -> int:
     sql = "SELECT problem FROM problem WHERE name = %s AND problem = %s"
-    rows = __cursor.execute(sql, (name, problem))
+    rows = _cursor().execute(sql, (name, problem))
     return rows
 
+def get_repeat_counts(name: str, problems: list) -> dict:
+    """
+    Returns:
+        dict: {문제 번호: 지금까지 푼 횟수}, 푼 적 없는 문제는 빠진다
+    """
+    if not problems: return {}
+    placeholders = ','.join(['%s'] * len(problems))
+    sql = f"SELECT problem, COUNT(*) FROM problem WHERE name = %s AND problem IN ({placeholders}) GROUP BY problem"
+    _cursor().execute(sql, (name, *problems))
+    return dict(_cursor().fetchall())
+
+def get_scored_days(user_id: int, since: datetime.datetime) -> set:
+    """
+    since 이후 문제를 풀어(이벤트 제외) 점수를 얻은 날짜들
+    """
+    sql = """
+        SELECT DISTINCT DATE(created_at) FROM score_history
+        WHERE user_id = %s
+        AND created_at >= %s
+        AND event_id IS NULL
+        AND problem_id IS NOT NULL
+    """
+    _cursor().execute(sql, (user_id, since))
+    return {i[0] for i in _cursor().fetchall()}
+
+def get_recent_solve_times(since: datetime.datetime) -> tuple:
+    """
+    since 이후에 푼 문제들의 (이름, 푼 시각). 초기화 때 넣은 기록(epoch)은 포함되지 않는다.
+    """
+    sql = "SELECT name, time FROM problem WHERE time >= %s"
+    _cursor().execute(sql, since)
+    return _cursor().fetchall()
+
+def get_events(since: datetime.datetime) -> tuple:
+    """
+    since 이후에 끝나는(진행 중이거나 앞으로 할) 이벤트
+    Returns:
+        tuple: (id, begin, end)
+    """
+    sql = "SELECT id, begin, end FROM event WHERE end >= %s ORDER BY id"
+    _cursor().execute(sql, since)
+    return _cursor().fetchall()
+
+def get_event_problem_pairs(since: datetime.datetime) -> tuple:
+    """
+    since 이후에 끝나는 이벤트의 문제
+    Returns:
+        tuple: (event_id, problem)
+    """
+    sql = """
+        SELECT ep.event_id, ep.problem FROM event_problem ep
+        JOIN event e ON e.id = ep.event_id
+        WHERE e.end >= %s
+    """
+    _cursor().execute(sql, since)
+    return _cursor().fetchall()
+
+def get_event_scored_problems(since: datetime.datetime) -> tuple:
+    """
+    since 이후에 끝나는 이벤트의 점수 기록과 그 점수를 받은 문제 번호
+    Returns:
+        tuple: (user_id, event_id, problem)
+    """
+    sql = """
+        SELECT sh.user_id, sh.event_id, p.problem FROM score_history sh
+        JOIN event e ON e.id = sh.event_id
+        JOIN problem p ON p.id = sh.problem_id
+        WHERE e.end >= %s
+    """
+    _cursor().execute(sql, since)
+    return _cursor().fetchall()
+
+def get_event_scored_problems_of(since: datetime.datetime, names: list) -> tuple:
+    """
+    names 사용자들에 한정한 get_event_scored_problems. 점수 기록이 없는 사용자도 (user_id, None, None)으로 한 행 나온다.
+    Returns:
+        tuple: (user_id, event_id, problem)
+    """
+    if not names: return ()
+    placeholders = ','.join(['%s'] * len(names))
+    sql = f"""
+        SELECT u.id, s.event_id, s.problem FROM user u
+        LEFT JOIN (
+            SELECT sh.user_id, sh.event_id, p.problem FROM score_history sh
+            JOIN event e ON e.id = sh.event_id
+            JOIN problem p ON p.id = sh.problem_id
+            WHERE e.end >= %s
+        ) s ON s.user_id = u.id
+        WHERE u.name IN ({placeholders})
+    """
+    _cursor().execute(sql, (since, *names))
+    return _cursor().fetchall()
+
 def get_users_by_problem(problem_id: int) -> tuple:
     """
     특정 문제 번호의 데이터를 가져온다.
@@ -232,84 +460,384 @@ def get_users_by_problem(problem_id: int) -> tuple:
         tuple: (id, name, problem, problem_tier, time, level, repeatation)
     """
     sql = "SELECT * FROM problem WHERE problem = %s"
-    rows = __cursor.execute(sql, (problem_id))
-    return __cursor.fetchall()
+    rows = _cursor().execute(sql, (problem_id))
+    return _cursor().fetchall()
 
 def get_bias():
     sql = """SELECT user_id, total_point FROM user_bias_total ut
             JOIN `user` AS u ON u.id = ut.user_id
             WHERE u.ignored = 0 AND total_point > 0
             """
-    __cursor.execute(sql)
-    return __cursor.fetchall()
+    _cursor().execute(sql)
+    return _cursor().fetchall()
 
-def get_user_bias(user_id: int):
-    sql = 'SELECT total_point FROM user_bias_total WHERE user_id = %s'
-    __cursor.execute(sql, user_id)
-    row = __cursor.fetchone()
-    if row:
-        return row[0]
-    else:
-        return 0
-    
 from dateutil.relativedelta import relativedelta
 def get_ranked_time(time: datetime.datetime) -> int:
     start = datetime.datetime(time.year, time.month, 1)
     end = start + relativedelta(months=1)
     sql = "SELECT COUNT(*) FROM ranking_boards WHERE created_at >= %s AND created_at < %s"
-    __cursor.execute(sql, (start, end))
-    count = __cursor.fetchone()[0]
+    _cursor().execute(sql, (start, end))
+    count = _cursor().fetchone()[0]
     return count + 1
 
 def get_user_tier(user_id: int):
     sql = 'SELECT tier FROM user WHERE id = %s'
-    __cursor.execute(sql, user_id)
-    return __cursor.fetchone()[0]
-
-def update_user_bias(user_id: int, bias: int, time: datetime):
-    row = get_user_bias(user_id)
-    sql = ''
-    if row == 0:
-        sql = "INSERT INTO user_bias_total (total_point, updated_at, user_id) VALUES (%s, %s, %s)"
-    else:
-        sql = "UPDATE user_bias_total SET total_point = %s, updated_at = %s WHERE user_id = %s"
-    __cursor.execute(sql, (bias, time, user_id))
+    _cursor().execute(sql, user_id)
+    return _cursor().fetchone()[0]
+
+def upsert_user_bias(rows: list) -> None:
+    """
+    Args:
+        rows (list of tuples): (user_id, total_point, updated_at)
+    """
+    if not rows: return
+    sql = """
+        INSERT INTO user_bias_total (user_id, total_point, updated_at) VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE total_point = VALUES(total_point), updated_at = VALUES(updated_at)
+    """
+    _cursor().executemany(sql, rows)
+
+def get_ranking_fingerprint() -> tuple:
+    """
+    추첨 결과가 의존하는 값들의 요약을 한 번에 가져온다.
+    score_history는 기본 키의 최댓값만 읽고, 제외된 사용자는 멤버 수만큼의 작은 user 테이블에서 계산한다.
+    Returns:
+        tuple: (score_history 최대 id, 제외된 사용자 수, 제외된 사용자 id 해시)
+    """
+    sql = """
+        SELECT * FROM
+            (SELECT COALESCE(MAX(id), 0) FROM score_history) h,
+            (SELECT COUNT(*), COALESCE(BIT_XOR(CRC32(id)), 0) FROM user WHERE ignored = 1) i
+    """
+    _cursor().execute(sql)
+    return tuple(_cursor().fetchone())
 
 def add_user_tier(user_id: int, tier: int):
     sql = 'UPDATE user SET tier = %s WHERE id = %s'
-    __cursor.execute(sql, (tier, user_id))
+    _cursor().execute(sql, (tier, user_id))
 
 def add_ranking_board(ranked_time: int, time: datetime.datetime):
     sql = 'INSERT INTO ranking_boards (title) VALUES (%s)'
-    __cursor.execute(sql, (f"{time.year}년 {time.month}월 {ranked_time}회차 추첨결과"))
-    return __cursor.lastrowid
+    _cursor().execute(sql, (f"{time.year}년 {time.month}월 {ranked_time}회차 추첨결과"))
+    return _cursor().lastrowid
 
 def add_ranked_user(board_id: int, rank: int, user_id: int):
     sql = 'INSERT INTO ranked_users (board_id, `rank`, user_id) VALUES (%s, %s, %s)'
-    __cursor.execute(sql, (board_id, rank, user_id))
+    _cursor().execute(sql, (board_id, rank, user_id))
+
+def add_ranked_users(board_id: int, rows: list) -> None:
+    """
+    Args:
+        rows (list of tuples): (rank, user_id)
+    """
+    if not rows: return
+    sql = 'INSERT INTO ranked_users (board_id, `rank`, user_id) VALUES (%s, %s, %s)'
+    _cursor().executemany(sql, [(board_id, rank, user_id) for rank, user_id in rows])
+
+def get_ignored_user_ids() -> set:
+    sql = 'SELECT id FROM user WHERE ignored = 1'
+    _cursor().execute(sql)
+    return {i[0] for i in _cursor().fetchall()}
 
 def is_ignored(user_id: int) -> bool:
     sql = 'SELECT ignored FROM user WHERE id = %s'
-    __cursor.execute(sql, user_id)
-    return __cursor.fetchone()[0] == 1
+    _cursor().execute(sql, user_id)
+    return _cursor().fetchone()[0] == 1
 
 def get_all_urls() -> tuple :
     sql = 'SELECT id, url FROM hook WHERE ignored = 0'
-    __cursor.execute(sql)
-    return __cursor.fetchall()
+    _cursor().execute(sql)
+    return _cursor().fetchall()
 
 def set_url_ignored (url_ids: [int]) -> None :
     placeholders = ','.join(['%s'] * len(url_ids))
     sql = f'UPDATE hook SET ignored = 1 WHERE id IN ({placeholders})'
-    __cursor.execute(sql, tuple(url_ids))
-    conn.commit()
+    _cursor().execute(sql, tuple(url_ids))
+    _connection().commit()
 
 def get_name_by_id(id: int) -> str:
     sql = 'SELECT name FROM user WHERE id = %s'
-    __cursor.execute(sql, (id))
-    return __cursor.fetchone()[0]
+    _cursor().execute(sql, (id))
+    return _cursor().fetchone()[0]
+
+def get_names_by_ids(ids: list) -> dict:
+    """
+    Returns:
+        dict: {id: name}
+    """
+    if not ids: return {}
+    placeholders = ','.join(['%s'] * len(ids))
+    sql = f'SELECT id, name FROM user WHERE id IN ({placeholders})'
+    _cursor().execute(sql, tuple(ids))
+    return {id: name for id, name in _cursor().fetchall()}
+
+def add_outbox(content: str, time: datetime.datetime) -> int:
+    sql = """
+        INSERT INTO webhook_outbox (content, status, attempts, next_attempt_at, created_at)
+        VALUES (%s, 'pending', 0, %s, %s)
+    """
+    _cursor().execute(sql, (content, time, time))
+    return _cursor().lastrowid
+
+def claim_latest_outbox(time: datetime.datetime, lease_until: datetime.datetime) -> tuple:
+    """
+    지금 보낼 수 있는 가장 최근의 알림을 sending으로 바꿔 가져온다. 호출한 쪽에서 커밋해야 다른 작업자에게 보인다.
+    다른 작업자가 가져가는 중인 행은 건너뛰고(SKIP LOCKED), 임대 기간이 지난 sending 행은 다시 가져온다.
+    Returns:
+        tuple: (id, content, 이번 시도를 더한 attempts) 또는 None
+    """
+    sql = """
+        SELECT id, content, attempts FROM webhook_outbox
+        WHERE status IN ('pending', 'sending') AND next_attempt_at <= %s
+        ORDER BY id DESC LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    """
+    _cursor().execute(sql, time)
+    row = _cursor().fetchone()
+    if row is None: return None
+    sql = "UPDATE webhook_outbox SET status = 'sending', attempts = attempts + 1, next_attempt_at = %s WHERE id = %s"
+    _cursor().execute(sql, (lease_until, row[0]))
+    return row[0], row[1], row[2] + 1
+
+def has_newer_outbox(outbox_id: int) -> bool:
+    """
+    outbox_id보다 나중에 기록된, 아직 유효한 알림이 있는지
+    """
+    sql = "SELECT 1 FROM webhook_outbox WHERE id > %s AND status IN ('pending', 'sending', 'delivered') LIMIT 1"
+    return _cursor().execute(sql, outbox_id) > 0
+
+def supersede_outbox(before_id: int) -> int:
+    """
+    before_id보다 먼저 쌓인 알림은 더 이상 보내지 않는다. (다른 작업자가 보내는 중인 sending은 건드리지 않는다)
+    Returns:
+        int: 건너뛴 알림 수
+    """
+    sql = "UPDATE webhook_outbox SET status = 'superseded' WHERE status = 'pending' AND id < %s"
+    return _cursor().execute(sql, before_id)
+
+def mark_outbox_superseded(outbox_id: int) -> None:
+    sql = "UPDATE webhook_outbox SET status = 'superseded' WHERE id = %s"
+    _cursor().execute(sql, outbox_id)
+
+def mark_outbox_delivered(outbox_id: int, attempts: int, time: datetime.datetime) -> None:
+    sql = "UPDATE webhook_outbox SET status = 'delivered', attempts = %s, delivered_at = %s WHERE id = %s"
+    _cursor().execute(sql, (attempts, time, outbox_id))
+
+def reschedule_outbox(outbox_id: int, attempts: int, next_attempt_at: datetime.datetime, last_error: str) -> None:
+    sql = "UPDATE webhook_outbox SET status = 'pending', attempts = %s, next_attempt_at = %s, last_error = %s WHERE id = %s"
+    _cursor().execute(sql, (attempts, next_attempt_at, last_error[:255], outbox_id))
+
+def mark_outbox_failed(outbox_id: int, attempts: int, last_error: str) -> None:
+    sql = "UPDATE webhook_outbox SET status = 'failed', attempts = %s, last_error = %s WHERE id = %s"
+    _cursor().execute(sql, (attempts, last_error[:255], outbox_id))
+
+def get_people(names: list) -> tuple:
+    """
+    Returns:
+        tuple: (name, corrects, submissions, solution), DB에 없는 이름은 빠진다
+    """
+    if not names: return ()
+    placeholders = ','.join(['%s'] * len(names))
+    sql = f"SELECT name, corrects, submissions, solution FROM user WHERE name IN ({placeholders})"
+    _cursor().execute(sql, tuple(names))
+    return _cursor().fetchall()
+
+def publish_crawl_queue(rows: list) -> None:
+    """
+    Args:
+        rows (list of tuples): (name, cycle_id, corrects, submissions, priority, updated_at)
+    """
+    if not rows: return
+    sql = """
+        INSERT INTO crawl_queue (name, cycle_id, corrects, submissions, priority, status, leased_by, lease_until, attempts, updated_at)
+        VALUES (%s, %s, %s, %s, %s, 'pending', NULL, NULL, 0, %s)
+        ON DUPLICATE KEY UPDATE
+            cycle_id = VALUES(cycle_id), corrects = VALUES(corrects), submissions = VALUES(submissions),
+            priority = VALUES(priority), status = 'pending', leased_by = NULL, lease_until = NULL,
+            attempts = 0, updated_at = VALUES(updated_at)
+    """
+    _cursor().executemany(sql, rows)
+
+def get_active_leases(time: datetime.datetime) -> set:
+    """
+    Returns:
+        set: 지금 작업자가 처리 중인(임대 기간이 남은) 사용자 이름
+    """
+    sql = "SELECT name FROM crawl_queue WHERE status = 'leased' AND lease_until >= %s"
+    _cursor().execute(sql, time)
+    return {i[0] for i in _cursor().fetchall()}
+
+def lease_crawl_queue(worker: str, limit: int, time: datetime.datetime, lease_until: datetime.datetime, max_attempts: int) -> tuple:
+    """
+    대기 중이거나 임대 기간이 지난 사용자를 limit명까지 임대한다. 호출한 쪽에서 커밋해야 다른 작업자에게 보인다.
+    다른 작업자가 잠근 행은 건너뛰므로(SKIP LOCKED) 여러 작업자가 같은 사용자를 받지 않는다.
+    이미 max_attempts번 임대했는데 끝내지 못한 사용자는 임대하지 않고 failed로 옮긴다.
+    Returns:
+        tuple: (임대한 (name, corrects, submissions) 리스트, failed로 옮긴 이름 리스트)
+    """
+    sql = """
+        SELECT name, corrects, submissions, attempts FROM crawl_queue
+        WHERE status = 'pending' OR (status = 'leased' AND lease_until < %s)
+        ORDER BY priority LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    """
+    _cursor().execute(sql, (time, limit))
+    rows = _cursor().fetchall()
+    leased = [(name, corrects, submissions) for name, corrects, submissions, attempts in rows if attempts < max_attempts]
+    failed = [name for name, _, _, attempts in rows if attempts >= max_attempts]
+    if failed:
+        placeholders = ','.join(['%s'] * len(failed))
+        sql = f"UPDATE crawl_queue SET status = 'failed', leased_by = NULL, lease_until = NULL, updated_at = %s WHERE name IN ({placeholders})"
+        _cursor().execute(sql, (time, *failed))
+    if leased:
+        placeholders = ','.join(['%s'] * len(leased))
+        sql = f"""
+            UPDATE crawl_queue SET status = 'leased', leased_by = %s, lease_until = %s, attempts = attempts + 1, updated_at = %s
+            WHERE name IN ({placeholders})
+        """
+        _cursor().execute(sql, (worker, lease_until, time, *[row[0] for row in leased]))
+    return leased, failed
+
+def hold_crawl_lease(name: str, worker: str) -> bool:
+    """
+    worker가 아직 name을 임대하고 있는지 확인하고, 트랜잭션이 끝날 때까지 그 행을 잠근다.
+    잠겨 있는 동안에는 임대 기간이 지나도 다른 작업자가 가져가지 못한다. (lease_crawl_queue의 SKIP LOCKED)
+    Returns:
+        bool: 임대 중이면 True, 임대 기간이 지나 다른 작업자가 가져갔으면 False
+    """
+    sql = "SELECT name FROM crawl_queue WHERE name = %s AND leased_by = %s AND status = 'leased' FOR UPDATE"
+    return _cursor().execute(sql, (name, worker)) > 0
+
+def complete_crawl_queue(names: list, worker: str, time: datetime.datetime) -> None:
+    """
+    임대 기간이 지나 다른 작업자가 다시 가져간 행은 건드리지 않는다.
+    """
+    if not names: return
+    placeholders = ','.join(['%s'] * len(names))
+    sql = f"""
+        UPDATE crawl_queue SET status = 'done', lease_until = NULL, updated_at = %s
+        WHERE leased_by = %s AND status = 'leased' AND name IN ({placeholders})
+    """
+    _cursor().execute(sql, (time, worker, *names))
+
+def count_crawl_queue_remaining(cycle_id: int) -> int:
+    sql = "SELECT COUNT(*) FROM crawl_queue WHERE cycle_id = %s AND status IN ('pending', 'leased')"
+    _cursor().execute(sql, cycle_id)
+    return _cursor().fetchone()[0]
+
+def add_onboarding(rows: list) -> None:
+    """
+    이미 있는 사용자는 건너뛴다.
+    Args:
+        rows (list of tuples): (name, corrects, submissions, time)
+    """
+    if not rows: return
+    sql = """
+        INSERT IGNORE INTO user_onboarding (name, status, corrects, submissions, next_attempt_at, created_at, updated_at)
+        VALUES (%s, 'initializing', %s, %s, %s, %s, %s)
+    """
+    _cursor().executemany(sql, [(name, corrects, submissions, time, time, time) for name, corrects, submissions, time in rows])
+
+def get_initializing_names() -> set:
+    """
+    초기화가 끝나지 않은(실패해 멈춘 것 포함) 사용자 이름
+    """
+    sql = "SELECT name FROM user_onboarding WHERE status IN ('initializing', 'failed')"
+    _cursor().execute(sql)
+    return {i[0] for i in _cursor().fetchall()}
+
+def get_next_onboarding(time: datetime.datetime) -> tuple:
+    """
+    지금 처리할 수 있는 가장 먼저 들어온 초기화 작업을 가져온다.
+    Returns:
+        tuple: (name, corrects, submissions, solution, tier, attempts) 또는 None, solution이 None이면 아직 시작하지 않았다.
+    """
+    sql = """
+        SELECT name, corrects, submissions, solution, tier, attempts FROM user_onboarding
+        WHERE status = 'initializing' AND next_attempt_at <= %s
+        ORDER BY created_at LIMIT 1
+    """
+    _cursor().execute(sql, time)
+    return _cursor().fetchone()
+
+def start_onboarding(name: str, solution: int, tier: int, time: datetime.datetime) -> None:
+    sql = "UPDATE user_onboarding SET solution = %s, tier = %s, updated_at = %s WHERE name = %s"
+    _cursor().execute(sql, (solution, tier, time, name))
+
+def update_onboarding_progress(name: str, done: int, total: int, time: datetime.datetime) -> None:
+    sql = "UPDATE user_onboarding SET problems_done = %s, problems_total = %s, updated_at = %s WHERE name = %s"
+    _cursor().execute(sql, (done, total, time, name))
+
+def finish_onboarding(name: str, time: datetime.datetime) -> None:
+    sql = "UPDATE user_onboarding SET status = 'done', last_error = NULL, updated_at = %s WHERE name = %s"
+    _cursor().execute(sql, (time, name))
+
+def reschedule_onboarding(name: str, attempts: int, next_attempt_at: datetime.datetime, last_error: str) -> None:
+    sql = "UPDATE user_onboarding SET attempts = %s, next_attempt_at = %s, last_error = %s WHERE name = %s"
+    _cursor().execute(sql, (attempts, next_attempt_at, last_error[:255], name))
+
+def fail_onboarding(name: str, attempts: int, last_error: str, time: datetime.datetime) -> None:
+    sql = "UPDATE user_onboarding SET status = 'failed', attempts = %s, last_error = %s, updated_at = %s WHERE name = %s"
+    _cursor().execute(sql, (attempts, last_error[:255], time, name))
+
+def get_solved_problem_numbers(name: str) -> set:
+    """
+    Returns:
+        set: 사용자의 problem 행에 있는 문제 번호
+    """
+    sql = "SELECT DISTINCT problem FROM problem WHERE name = %s"
+    _cursor().execute(sql, name)
+    return {i[0] for i in _cursor().fetchall()}
+
+def get_crawl_cursors() -> dict:
+    """
+    Returns:
+        dict: {name: (resume_top, stop_solution)}
+    """
+    sql = "SELECT name, resume_top, stop_solution FROM crawl_cursor"
+    _cursor().execute(sql)
+    return {name: (resume_top, stop_solution) for name, resume_top, stop_solution in _cursor().fetchall()}
+
+def upsert_crawl_cursor(name: str, resume_top: int, stop_solution: int, time: datetime.datetime) -> None:
+    sql = """
+        INSERT INTO crawl_cursor (name, resume_top, stop_solution, updated_at) VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE resume_top = VALUES(resume_top), stop_solution = VALUES(stop_solution), updated_at = VALUES(updated_at)
+    """
+    _cursor().execute(sql, (name, resume_top, stop_solution, time))
+
+def delete_crawl_cursor(name: str) -> None:
+    sql = "DELETE FROM crawl_cursor WHERE name = %s"
+    _cursor().execute(sql, name)
+
+def get_problem_tier_cache(limit: int) -> tuple:
+    """
+    최근에 조회한 문제 티어를 오래된 것부터 가져온다. (차례로 캐시에 넣으면 가장 최근 것이 가장 나중에 버려진다)
+    Args:
+        limit (int): 가져올 최대 개수
+    Returns:
+        tuple: (problem, tier, updated_at)
+    """
+    sql = """
+        SELECT problem, tier, updated_at FROM
+            (SELECT problem, tier, updated_at FROM problem_tier_cache ORDER BY updated_at DESC LIMIT %s) recent
+        ORDER BY updated_at ASC
+    """
+    _cursor().execute(sql, limit)
+    return _cursor().fetchall()
+
+def save_problem_tier_cache(rows: list) -> None:
+    """
+    Args:
+        rows (list of tuples): (problem, tier, updated_at)
+    """
+    if not rows: return
+    sql = """
+        INSERT INTO problem_tier_cache (problem, tier, updated_at) VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE tier = VALUES(tier), updated_at = VALUES(updated_at)
+    """
+    _cursor().executemany(sql, rows)
+
 
-    
 """
 #디버깅용 삭제 쿼리
 def delete_user_info(name: str):
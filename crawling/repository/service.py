@@ -1,5 +1,6 @@
 from repository import db
-import datetime, random, os, pytz
+from score import shuffle
+import datetime, os, pytz
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -24,26 +25,20 @@ def get_shuffle(ranks):
     Args:
         ranks (list of tuples): (이름, 점수) 리스트
     Returns:
-        list of tuples: 가중치를 반영해 셔플된 중복 제거 리스트
+        list of tuples: 가중치를 반영해 셔플된 중복 제거 리스트 (score/shuffle.py 참고)
     """
     now = datetime.datetime.now(timezone).replace(tzinfo=None)
     year = now.year
     month = now.month
     seed = f'{RANDOM_SEED}-{year * 100 + month}'
-    weighted_user = []
-    total = 0
-    for name, score in ranks:
-        total += score
-        weighted_user.extend([(name, score)] * int(score ** 1.05))
+    total = sum(score for name, score in ranks)
     seed = seed + f'-{total}'
-    random.seed(seed)
-    random.shuffle(weighted_user)
-    shuffled = list(dict.fromkeys(weighted_user))
-    res = [(name, score) for name, score in shuffled]
-    return res
+    # 달마다 정해진 버전의 알고리즘을 사용해 지난 달의 결과도 그대로 재현할 수 있다.
+    return shuffle.weighted_shuffle(ranks, seed, year * 100 + month)
 
 def filter_ignored(ranks):
-    return [(user_id, score) for user_id, score in ranks if not db.get_user_ignored(user_id)]
+    ignored = db.get_ignored_user_ids()
+    return [(user_id, score) for user_id, score in ranks if not user_id in ignored]
 
 def update_bias():
     """
@@ -51,18 +46,17 @@ def update_bias():
     """
 
     kst_now = datetime.datetime.now(timezone)
-    score_history = db.get_score_history_by_month(kst_now)
-    bias_total = {}
+    changed = db.get_changed_bias(kst_now)
+    db.upsert_user_bias([(user_id, total, kst_now) for user_id, total in changed])
 
-    for user_id, score in score_history:
-        if not user_id in bias_total:
-            bias_total[user_id] = score
-        else:
-            bias_total[user_id] += score
-
-    for user_id in bias_total:
-        if bias_total[user_id] != db.get_user_bias(user_id):
-            db.update_user_bias(user_id, bias_total[user_id], datetime.datetime.now(timezone))
+def get_ranking_fingerprint() -> tuple:
+    """
+    추첨 결과가 의존하는 값들의 지문. 지난 추첨 뒤의 지문과 같으면 점수 합산, 정렬, 셔플을 다시 할 필요가 없다.
+    (이번 달, 점수 기록의 최대 id, 제외된 사용자 집합)
+    점수 기록은 추가만 되므로 최대 id로 충분하다. 기존 기록을 고치거나 지운 것은 다음 점수 기록이나 달이 바뀔 때 반영된다.
+    """
+    kst_now = datetime.datetime.now(timezone)
+    return (kst_now.year * 100 + kst_now.month, *db.get_ranking_fingerprint())
 
 def is_eventing_problem(problem: int, time: datetime.datetime) -> bool:
     """
@@ -143,15 +137,40 @@ def scored_by_event(user_id: int, event_id: int, problem: int, problem_id: int,
     """
     db.add_score_history(user_id, f"Event(#{event_id})의 {problem}번 문제 해결", 1, event_id, problem_id, time)
 
+def get_repeat_counts(name: str, problems: list) -> dict:
+    return db.get_repeat_counts(name, problems)
+
+def get_scored_days(user_id: int, since: datetime.datetime) -> set:
+    return db.get_scored_days(user_id, since)
+
+def get_recent_solve_times(since: datetime.datetime):
+    return db.get_recent_solve_times(since)
+
+def get_events(since: datetime.datetime):
+    return db.get_events(since)
+
+def get_event_problem_pairs(since: datetime.datetime):
+    return db.get_event_problem_pairs(since)
+
+def get_event_scored_problems(since: datetime.datetime):
+    return db.get_event_scored_problems(since)
+
+def get_event_scored_problems_of(since: datetime.datetime, names: list):
+    return db.get_event_scored_problems_of(since, names)
+
+def insert_problems(rows: list) -> list:
+    return db.insert_problems(rows)
+
+def add_score_histories(rows: list):
+    db.add_score_histories(rows)
+
 def save_ranking(lotto: list, time: datetime.datetime):
     ranked_time = db.get_ranked_time(time)
     board_id = db.add_ranking_board(ranked_time, time)
 
-    rank = 0
-    for user_id, score in lotto:
-        if db.is_ignored(user_id): continue
-        rank += 1
-        db.add_ranked_user(board_id, rank, user_id)
+    ignored = db.get_ignored_user_ids()
+    rows = [user_id for user_id, score in lotto if not user_id in ignored]
+    db.add_ranked_users(board_id, list(enumerate(rows, start=1)))
 
 def open_db():
     db.open_db()
@@ -162,6 +181,73 @@ def close_db():
 def db_commit():
     db.db_commit()
 
+def get_people(names: list):
+    return db.get_people(names)
+
+def publish_crawl_queue(rows: list):
+    db.publish_crawl_queue(rows)
+
+def get_active_leases(time: datetime.datetime) -> set:
+    return db.get_active_leases(time)
+
+def lease_crawl_queue(worker: str, limit: int, time: datetime.datetime, lease_until: datetime.datetime, max_attempts: int):
+    return db.lease_crawl_queue(worker, limit, time, lease_until, max_attempts)
+
+def hold_crawl_lease(name: str, worker: str) -> bool:
+    return db.hold_crawl_lease(name, worker)
+
+def complete_crawl_queue(names: list, worker: str, time: datetime.datetime):
+    db.complete_crawl_queue(names, worker, time)
+
+def count_crawl_queue_remaining(cycle_id: int) -> int:
+    return db.count_crawl_queue_remaining(cycle_id)
+
+def add_onboarding(rows: list):
+    db.add_onboarding(rows)
+
+def get_initializing_names() -> set:
+    return db.get_initializing_names()
+
+def get_next_onboarding(time: datetime.datetime):
+    return db.get_next_onboarding(time)
+
+def start_onboarding(name: str, solution: int, tier: int, time: datetime.datetime):
+    db.start_onboarding(name, solution, tier, time)
+
+def update_onboarding_progress(name: str, done: int, total: int, time: datetime.datetime):
+    db.update_onboarding_progress(name, done, total, time)
+
+def finish_onboarding(name: str, time: datetime.datetime):
+    db.finish_onboarding(name, time)
+
+def reschedule_onboarding(name: str, attempts: int, next_attempt_at: datetime.datetime, last_error: str):
+    db.reschedule_onboarding(name, attempts, next_attempt_at, last_error)
+
+def fail_onboarding(name: str, attempts: int, last_error: str, time: datetime.datetime):
+    db.fail_onboarding(name, attempts, last_error, time)
+
+def get_solved_problem_numbers(name: str) -> set:
+    return db.get_solved_problem_numbers(name)
+
+def get_crawl_cursors() -> dict:
+    return db.get_crawl_cursors()
+
+def save_crawl_cursor(name: str, cursor: tuple, time: datetime.datetime):
+    """
+    Args:
+        cursor (tuple): (resume_top, stop_solution), None이면 지운다.
+    """
+    if cursor is None:
+        db.delete_crawl_cursor(name)
+    else:
+        db.upsert_crawl_cursor(name, cursor[0], cursor[1], time)
+
+def session():
+    return db.session()
+
+def transaction():
+    return db.transaction()
+
 def get_user_id(name: str):
     return db.get_user_id(name)
 
@@ -186,6 +272,12 @@ def add_problem(username: str, problem_id: int, level: int, problem_tier: int, t
 def get_user():
     return db.get_user()
 
+def get_problem_tier_cache(limit: int):
+    return db.get_problem_tier_cache(limit)
+
+def save_problem_tier_cache(rows: list):
+    db.save_problem_tier_cache(rows)
+
 def get_bias():
     data = {}
     for e in db.get_bias():
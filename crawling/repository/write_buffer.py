@@ -0,0 +1,74 @@
+from repository import service
+import metrics
+
+class WriteBuffer:
+    """
+    problem, score_history 행을 모아 두었다가 여러 행 INSERT로 한 번에 쓴다.
+    score_history 행은 아직 id가 없는 problem 행을 buffer 안의 위치로 가리키고, flush할 때 실제 id로 바꾼다.
+    flush는 호출한 쪽의 트랜잭션 안에서 실행되며 커밋하지 않는다.
+    """
+    def __init__(self, chunk_rows: int) -> None:
+        self.__chunk_rows = chunk_rows  # INSERT 문 하나에 넣을 최대 행 수
+        self.__problems = []            # (name, problem, problem_tier, time, level, repeatation)
+        self.__histories = []           # (user_id, desc, bias, event_id, problem 위치, created_at)
+        self.__callbacks = []           # 커밋된 뒤 실행할 함수들
+        self.users = 0                  # 이번 묶음에 들어간 사용자 수
+
+    def add_problem(self, name: str, problem: int, problem_tier: int, time, level: int, repeatation: int) -> int:
+        """
+        Returns:
+            int: buffer 안에서의 위치 (add_score_history에 넘긴다)
+        """
+        self.__problems.append((name, problem, problem_tier, time, level, repeatation))
+        return len(self.__problems) - 1
+
+    def add_score_history(self, user_id: int, desc: str, bias: int, event_id: int, problem: int, created_at) -> None:
+        self.__histories.append((user_id, desc, bias, event_id, problem, created_at))
+
+    def after_commit(self, callback) -> None:
+        self.__callbacks.append(callback)
+
+    def flush(self) -> int:
+        """
+        모아 둔 행을 DB에 쓰고 비운다.
+        Returns:
+            int: 실행한 INSERT 문 수
+        """
+        statements = 0
+        ids = []
+        for start in range(0, len(self.__problems), self.__chunk_rows):
+            chunk = self.__problems[start:start + self.__chunk_rows]
+            ids.extend(service.insert_problems(chunk))
+            statements += 1
+
+        histories = [
+            (user_id, desc, bias, event_id, ids[problem], created_at)
+            for user_id, desc, bias, event_id, problem, created_at in self.__histories
+        ]
+        for start in range(0, len(histories), self.__chunk_rows):
+            service.add_score_histories(histories[start:start + self.__chunk_rows])
+            statements += 1
+        metrics.inc("rows_written_total", len(self.__problems), {"table": "problem"}, "추가한 행 수")
+        metrics.inc("rows_written_total", len(histories), {"table": "score_history"}, "추가한 행 수")
+        metrics.inc("insert_statements_total", statements, None, "실행한 INSERT 문 수")
+        self.__problems.clear()
+        self.__histories.clear()
+        return statements
+
+    def committed(self) -> None:
+        """
+        flush한 트랜잭션이 커밋된 뒤 호출한다.
+        """
+        callbacks, self.__callbacks = self.__callbacks, []
+        self.users = 0
+        for callback in callbacks:
+            callback()
+
+    def discard(self) -> None:
+        """
+        트랜잭션이 롤백되었을 때 호출한다. 모아 둔 행과 커밋 후 작업을 버린다.
+        """
+        self.__problems.clear()
+        self.__histories.clear()
+        self.__callbacks.clear()
+        self.users = 0
@@ -0,0 +1,115 @@
+import time, random, threading, traceback
+from collections import deque
+from typing import Callable, NamedTuple
+from logger import msg, warning, error, debug
+import metrics
+
+class CycleRecord(NamedTuple):
+    scheduled: float    # 예정 시각 (epoch 초)
+    started: float      # 시작 시각 (epoch 초)
+    finished: float     # 종료 시각 (epoch 초)
+    lag: float          # 예정 시각보다 늦게 시작한 시간 (초)
+    coalesced: int      # 이번 실행으로 합쳐진, 놓친 주기 수
+    ok: bool            # 예외 없이 끝났는지
+
+class Scheduler:
+    """
+    interval초 경계(예: 5분이면 :00, :05, ...)마다 job을 실행한다.
+    - 한 번에 하나의 주기만 실행한다. (single-flight)
+    - 주기가 길어져 놓친 예정 시각들은 하나로 합쳐 끝나자마자 한 번만 따라잡는다.
+    - jitter초 이내의 무작위 지연을 두고 시작할 수 있다.
+    - budget초가 주어지면 job에 마감 시각(time.monotonic 기준)을 넘긴다.
+    - minor가 주어지면 job 사이의 minor_interval초 경계마다 minor를 실행한다. job과 겹치는 경계에서는 job만 실행하고,
+      job이나 minor가 길어져 지나간 minor 경계는 따라잡지 않고 버린다. (job이 minor_interval보다 긴 것은 정상이다)
+    """
+    def __init__(self, job: Callable, interval: float, jitter: float = 0.0, budget: float = 0.0, history: int = 100,
+                 minor: Callable = None, minor_interval: float = 0.0) -> None:
+        self.__job = job
+        self.__interval = interval
+        self.__minor = minor
+        self.__minor_interval = minor_interval
+        self.__jitter = jitter
+        self.__budget = budget
+        self.__lock = threading.Lock()
+        self.records = deque(maxlen=history)
+
+    def next_boundary(self, now: float) -> float:
+        return (now // self.__interval + 1) * self.__interval
+
+    def run_once(self, scheduled: float, coalesced: int = 0) -> bool:
+        """
+        job을 한 번 실행한다. 이미 실행 중이면 실행하지 않는다.
+        Returns:
+            bool: 실행했으면 True
+        """
+        if not self.__lock.acquire(blocking=False):
+            warning("이전 주기가 아직 실행 중이라 이번 주기를 건너뜁니다.")
+            return False
+        try:
+            started = time.time()
+            lag = max(0.0, started - scheduled)
+            deadline = time.monotonic() + self.__budget if self.__budget > 0 else None
+            ok = True
+            try:
+                self.__job(deadline)
+            except Exception:
+                ok = False
+                error(f"주기 실행 중 예외가 발생했습니다.\n{traceback.format_exc()}")
+            finished = time.time()
+            self.records.append(CycleRecord(scheduled, started, finished, lag, coalesced, ok))
+            metrics.observe("crawl_cycle_seconds", finished - started, None, "주기 소요 시간")
+            metrics.observe("crawl_cycle_lag_seconds", lag, None, "예정 시각보다 늦게 시작한 시간")
+            metrics.inc("crawl_cycles_total", 1, {"result": "ok" if ok else "error"}, "실행한 주기 수")
+            metrics.dump_cycle({"duration": round(finished - started, 3), "lag": round(lag, 3), "coalesced": coalesced, "ok": ok})
+            msg(f"주기 종료: {finished - started:.1f}초 소요, 지연 {lag:.1f}초"
+                + (f", 놓친 주기 {coalesced}개 합침" if coalesced else "")
+                + ("" if ok else ", 실패"),
+                stage="cycle", duration=round(finished - started, 3), lag=round(lag, 3), coalesced=coalesced, ok=ok)
+            return True
+        finally:
+            self.__lock.release()
+
+    def __next_minor(self, now: float) -> float:
+        if self.__minor is None: return float("inf")
+        return (now // self.__minor_interval + 1) * self.__minor_interval
+
+    def run_minor(self) -> None:
+        """
+        minor를 한 번 실행한다. 기록과 주기 지표는 남기지 않는다.
+        """
+        if not self.__lock.acquire(blocking=False): return
+        try:
+            deadline = time.monotonic() + self.__budget if self.__budget > 0 else None
+            self.__minor(deadline)
+        except Exception:
+            error(f"주기 사이 작업 중 예외가 발생했습니다.\n{traceback.format_exc()}")
+        finally:
+            self.__lock.release()
+
+    def run_forever(self) -> None:
+        scheduled = self.next_boundary(time.time())
+        minor_at = self.__next_minor(time.time())
+        while True:
+            if minor_at < scheduled:
+                wait = minor_at - time.time()
+                if wait > 0:
+                    time.sleep(wait)
+                self.run_minor()
+                minor_at = self.__next_minor(time.time())
+                continue
+
+            wait = scheduled + random.uniform(0, self.__jitter) - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            self.run_once(scheduled)
+
+            # 실행 중 지나간 예정 시각은 하나로 합쳐 바로 한 번 실행하고, 다시 경계에 맞춘다.
+            now = time.time()
+            missed = int((now - scheduled) // self.__interval)
+            while missed > 0:
+                warning(f"주기가 길어져 예정 시각 {missed}개를 놓쳤습니다. 한 번만 따라잡습니다.")
+                self.run_once(now, missed)
+                scheduled, now = now, time.time()
+                missed = int((now - scheduled) // self.__interval)
+            scheduled = self.next_boundary(now)
+            minor_at = self.__next_minor(now)
@@ -0,0 +1,56 @@
+import datetime, heapq
+
+class ActivityQueue:
+    """
+    사용자별 최근 풀이 활동과 마지막 갱신 시각으로 크롤링 우선순위를 정한다.
+    활동 점수는 풀이 하나당 1점이고 half_life마다 절반으로 줄어든다.
+    우선순위 = (활동 점수 + 기본값) x 마지막 갱신 이후 지난 시간(초)
+    """
+    def __init__(self, half_life: datetime.timedelta, base: float = 0.01) -> None:
+        self.__half_life = half_life.total_seconds()
+        self.__base = base              # 활동이 없는 사용자도 오래되면 앞으로 오도록 더하는 값
+        self.__activity = {}            # {이름: (활동 점수, 기준 시각)}
+        self.__refreshed = {}           # {이름: 마지막 갱신 시각}
+
+    def __decay(self, seconds: float) -> float:
+        return 0.5 ** (max(0.0, seconds) / self.__half_life)
+
+    def activity(self, name: str, now: datetime.datetime) -> float:
+        score, at = self.__activity.get(name, (0.0, now))
+        return score * self.__decay((now - at).total_seconds())
+
+    def add_solves(self, name: str, times: list, now: datetime.datetime) -> None:
+        score = self.activity(name, now)
+        for time in times:
+            score += self.__decay((now - time).total_seconds())
+        self.__activity[name] = (score, now)
+
+    def mark_refreshed(self, name: str, now: datetime.datetime) -> None:
+        self.__refreshed[name] = now
+
+    def staleness(self, name: str, now: datetime.datetime) -> float:
+        refreshed = self.__refreshed.get(name)
+        if refreshed is None: return float('inf')
+        return (now - refreshed).total_seconds()
+
+    def priority(self, name: str, now: datetime.datetime) -> float:
+        return (self.activity(name, now) + self.__base) * self.staleness(name, now)
+
+    def order(self, people: list, now: datetime.datetime) -> list:
+        """
+        Args:
+            people (list of tuples): (name, corrects, submissions)
+        Returns:
+            list: 우선순위가 높은 순서로 정렬한 people
+        """
+        return sorted(people, key=lambda person: self.priority(person[0], now), reverse=True)
+
+    def hot(self, now: datetime.datetime, threshold: float, interval: datetime.timedelta, limit: int) -> list:
+        """
+        활동 점수가 threshold 이상이고 interval 넘게 갱신하지 않은 사용자 중 우선순위가 높은 limit명
+        """
+        candidates = [
+            name for name in self.__activity
+            if self.activity(name, now) >= threshold and self.staleness(name, now) >= interval.total_seconds()
+        ]
+        return heapq.nlargest(limit, candidates, key=lambda name: self.priority(name, now))
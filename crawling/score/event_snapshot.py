@@ -0,0 +1,77 @@
+import datetime
+from repository import service
+
+# 기본으로 불러올 기간. 이보다 오래된 풀이를 반영할 때는 그 풀이 시각부터 다시 불러온다.
+EVENT_LOOKBACK = datetime.timedelta(days=1)
+
+class EventSnapshot:
+    """
+    크롤링 주기 동안 사용할 이벤트 정보.
+    이벤트 기간, 이벤트별 문제, 사용자별로 이미 점수를 받은 (event_id, 문제 번호)를 한 번에 불러와
+    문제마다 DB를 조회하지 않고 집합 조회로 판단한다.
+    """
+    def __init__(self, events: dict, problems: dict, scored: dict, loaded_at: datetime.datetime, since: datetime.datetime) -> None:
+        self.since = since            # 이 시각 이후에 끝나는 이벤트만 불러왔다.
+        self.__events = events        # {event_id: (begin, end)}
+        self.__problems = problems    # {event_id: {문제 번호}}
+        self.__scored = scored        # {user_id: {(event_id, 문제 번호)}}
+        # 불러온 뒤 처음으로 이벤트가 시작하거나 끝나는 시각. 이 시각이 지나면 다시 불러온다.
+        boundaries = [t for begin, end in events.values() for t in (begin, end) if t > loaded_at]
+        self.valid_until = min(boundaries, default=None)
+
+    def expired(self, now: datetime.datetime) -> bool:
+        return self.valid_until is not None and now >= self.valid_until
+
+    def covers(self, time: datetime.datetime) -> bool:
+        """
+        time에 진행 중이던 이벤트를 모두 불러왔는지
+        """
+        return time >= self.since
+
+    def ongoing(self, problem: int, time: datetime.datetime) -> list:
+        """
+        Returns:
+            list: time에 진행 중이고 problem을 포함하는 이벤트 id들
+        """
+        return [
+            event_id for event_id, (begin, end) in self.__events.items()
+            if begin < time < end and problem in self.__problems.get(event_id, ())
+        ]
+
+    def has_score(self, user_id: int, event_id: int, problem: int) -> bool:
+        return (event_id, problem) in self.__scored.get(user_id, ())
+
+    def record_score(self, user_id: int, event_id: int, problem: int) -> None:
+        self.__scored.setdefault(user_id, set()).add((event_id, problem))
+
+    def replace_scored(self, rows) -> None:
+        """
+        rows에 나온 사용자들의 점수 기록을 rows로 바꾼다. event_id가 None인 행은 기록이 없는 사용자다.
+        """
+        fresh = {}
+        for user_id, event_id, problem in rows:
+            scored = fresh.setdefault(user_id, set())
+            if event_id is not None: scored.add((event_id, problem))
+        self.__scored.update(fresh)
+
+def load(since: datetime.datetime = None) -> EventSnapshot:
+    """
+    since(기본: EVENT_LOOKBACK 전) 이후에 끝나는 이벤트 정보를 불러온다. (쿼리 3번)
+    끝난 이벤트의 점수 기록은 다시 읽지 않으므로 기록이 쌓여도 비용이 늘지 않는다.
+    """
+    now = datetime.datetime.now()
+    if since is None: since = now - EVENT_LOOKBACK
+    events = {event_id: (begin, end) for event_id, begin, end in service.get_events(since)}
+    problems = {}
+    for event_id, problem in service.get_event_problem_pairs(since):
+        problems.setdefault(event_id, set()).add(problem)
+    scored = {}
+    for user_id, event_id, problem in service.get_event_scored_problems(since):
+        scored.setdefault(user_id, set()).add((event_id, problem))
+    return EventSnapshot(events, problems, scored, now, since)
+
+def refresh_scored(snapshot: EventSnapshot, names: list) -> None:
+    """
+    names 사용자들의 이벤트 점수 기록만 다시 읽는다. (쿼리 1번)
+    """
+    snapshot.replace_scored(service.get_event_scored_problems_of(snapshot.since, names))
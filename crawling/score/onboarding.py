@@ -0,0 +1,126 @@
+import os, time, datetime, threading
+from multiprocessing import Process
+from info import user_info, solvedac_api
+from repository import service
+from repository.write_buffer import WriteBuffer
+from score import solvedac
+import metrics
+from logger import msg, warning, error, debug
+from dotenv import load_dotenv
+load_dotenv()
+
+# 한 트랜잭션에 저장할 문제 수, 요청 사이에 쉬는 시간(초, 정기 크롤링과 나눠 쓰는 요청 예산), 할 일이 없을 때 기다리는 시간(초)
+ONBOARDING_CHUNK = int(os.getenv("ONBOARDING_CHUNK", "200"))
+ONBOARDING_DELAY = float(os.getenv("ONBOARDING_DELAY", "1"))
+ONBOARDING_POLL = float(os.getenv("ONBOARDING_POLL", "10"))
+# 실패했을 때 다시 시도하기까지 기다리는 시간(초, 실패할 때마다 두 배, 최대 1시간)
+ONBOARDING_BACKOFF = float(os.getenv("ONBOARDING_BACKOFF", "60"))
+# 이 횟수만큼 실패하면 더 이상 재시도하지 않고 failed로 둔다. (정기 크롤링에서는 계속 빠진다)
+ONBOARDING_MAX_ATTEMPTS = int(os.getenv("ONBOARDING_MAX_ATTEMPTS", "5"))
+
+buffer = WriteBuffer(ONBOARDING_CHUNK)
+
+def onboard_once(now: datetime.datetime) -> bool:
+    """
+    가장 먼저 들어온 초기화 작업 하나를 끝까지 처리한다.
+    마지막 제출 번호와 티어를 먼저 저장하고, 맞은 문제는 ONBOARDING_CHUNK개씩 커밋하므로
+    중간에 멈춰도 다음에는 이미 저장한 문제를 빼고 이어서 처리한다.
+    Returns:
+        bool: 처리한 작업이 있으면 True
+    """
+    with service.transaction():
+        row = service.get_next_onboarding(now)
+    if row is None:
+        return False
+    name, corrects, submissions, solution, user_tier, attempts = row
+
+    try:
+        with metrics.stage("onboarding"):
+            __onboard(name, corrects, submissions, solution, user_tier)
+    except Exception as e:
+        buffer.discard()
+        attempts += 1
+        if attempts >= ONBOARDING_MAX_ATTEMPTS:
+            error(f'{name}님 초기화가 {attempts}회 실패해 중단합니다. 원인을 확인한 뒤 user_onboarding을 initializing으로 되돌려 주세요: {str(e)}', user=name)
+            metrics.inc("onboarding_failed_total", 1, None, "재시도 횟수를 넘겨 중단한 초기화 작업 수")
+            with service.transaction():
+                service.fail_onboarding(name, attempts, str(e), datetime.datetime.now())
+            return True
+        next_attempt_at = datetime.datetime.now() + datetime.timedelta(seconds=min(3600, ONBOARDING_BACKOFF * 2 ** (attempts - 1)))
+        warning(f'{name}님 초기화 실패 ({attempts}회), {next_attempt_at}에 이어서 처리합니다: {str(e)}', user=name)
+        with service.transaction():
+            service.reschedule_onboarding(name, attempts, next_attempt_at, str(e))
+    return True
+
+def __onboard(name, corrects, submissions, solution, user_tier):
+    if solution is None:
+        # 이 제출 번호 이후의 풀이는 초기화가 끝난 뒤 정기 크롤링이 가져간다.
+        solution = user_info.last_solution(name, "init")
+        time.sleep(ONBOARDING_DELAY)
+        user_tier = solvedac_api.user_tier(name)
+        if user_tier is None:
+            raise RuntimeError("solved.ac에서 사용자 티어를 조회하지 못했습니다.")
+        with service.transaction():
+            service.update_user(name, corrects, submissions, solution, user_tier)
+            service.start_onboarding(name, solution, user_tier, datetime.datetime.now())
+        time.sleep(ONBOARDING_DELAY)
+
+    problems = user_info.solved_problems(name, "init")
+    done = service.get_solved_problem_numbers(name)
+    todo = [problem for problem in problems if problem not in done]
+    if done:
+        msg(f'{name}님 초기화를 이어서 진행합니다. (저장한 문제 {len(done)}개, 남은 문제 {len(todo)}개)', user=name)
+
+    saved = len(problems) - len(todo)
+    for start in range(0, len(todo), ONBOARDING_CHUNK):
+        time.sleep(ONBOARDING_DELAY)
+        chunk = todo[start:start + ONBOARDING_CHUNK]
+        tiers = solvedac.lookup_tiers(chunk)
+        unknown = [problem for problem in chunk if tiers[problem] is None]
+        if unknown:
+            # solved.ac에 티어가 없는 문제는 Unrated(0)로 저장한다. 초기화로 넣는 문제는 점수와 관계가 없다.
+            warning(f'{name}님 초기화: 티어를 알 수 없는 문제 {len(unknown)}개를 Unrated로 저장합니다.', user=name, problems=unknown)
+            metrics.inc("onboarding_unknown_tier_total", len(unknown), None, "초기화에서 티어를 알 수 없어 Unrated로 저장한 문제 수")
+        for problem in chunk:
+            problem_tier = tiers[problem] or 0
+            buffer.add_problem(name, problem, problem_tier, datetime.datetime(1970,1,1), problem_tier - user_tier, 0)
+        saved += len(chunk)
+        with service.transaction():
+            buffer.flush()
+            service.update_onboarding_progress(name, saved, len(problems), datetime.datetime.now())
+        buffer.committed()
+        debug(f'{name}님 초기화 진행: {saved}/{len(problems)}', user=name, stage="onboarding")
+
+    with service.transaction():
+        solvedac.save_tiers()
+        service.finish_onboarding(name, datetime.datetime.now())
+    metrics.inc("users_crawled_total", 1, {"kind": "new"}, "DB에 반영한 사용자 수")
+    msg(f'{name}님 정보를 초기화 했습니다. (맞힌 문제 수: {corrects}, 제출 수: {submissions})', user=name, corrects=corrects, submissions=submissions)
+
+def run() -> None:
+    """
+    초기화 작업을 계속 처리하는 작업자. 자기 스레드(또는 프로세스)에 묶인 DB 연결을 사용한다.
+    """
+    msg("새 멤버 초기화 작업자 시작")
+    while True:
+        try:
+            with service.session():
+                while onboard_once(datetime.datetime.now()):
+                    pass
+        except Exception as e:
+            error(f"새 멤버 초기화 작업자 에러: {str(e)}")
+        time.sleep(ONBOARDING_POLL)
+
+def start(mode: str = "thread"):
+    """
+    초기화 작업자를 크롤러와 함께 실행한다.
+    Args:
+        mode (str): thread면 같은 프로세스의 스레드로, process면 별도 프로세스로 실행한다.
+    """
+    worker_type = Process if mode == "process" else threading.Thread
+    worker = worker_type(target=run, name="onboarding", daemon=True)
+    worker.start()
+    return worker
+
+if __name__ == "__main__":
+    run()
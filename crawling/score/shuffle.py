@@ -0,0 +1,53 @@
+import os, math, random
+from dotenv import load_dotenv
+load_dotenv()
+
+# v2를 처음 적용할 달(yyyymm). 이전 달의 추첨 결과는 v1으로 그대로 재현된다.
+SHUFFLE_V2_FROM = int(os.getenv("SHUFFLE_V2_FROM", "202611"))
+
+def weight(score: int) -> int:
+    return int(score ** 1.05)
+
+def shuffle_v1(ranks: list, seed: str) -> list:
+    """
+    점수 가중치만큼 (이름, 점수)를 복제해 섞은 뒤 처음 나온 순서대로 중복을 제거한다.
+    시간과 메모리가 사용자 수가 아니라 가중치 합에 비례한다.
+    """
+    weighted_user = []
+    for name, score in ranks:
+        weighted_user.extend([(name, score)] * weight(score))
+    random.Random(seed).shuffle(weighted_user)
+    shuffled = list(dict.fromkeys(weighted_user))
+    return [(name, score) for name, score in shuffled]
+
+def shuffle_v2(ranks: list, seed: str) -> list:
+    """
+    가중치 비복원 추출(Efraimidis-Spirakis). 사용자마다 key = ln(u) / weight를 뽑아 내림차순 정렬한다.
+    v1과 같은 분포(가중치에 비례해 앞에서부터 한 명씩 뽑는 것)를 O(N log N)으로 만든다.
+    """
+    rng = random.Random(seed)
+    keyed = []
+    for name, score in ranks:
+        w = weight(score)
+        u = 1.0 - rng.random()  # (0, 1]
+        if w <= 0: continue     # v1에서도 가중치가 0이면 추첨에서 빠진다
+        keyed.append((math.log(u) / w, name, score))
+    keyed.sort(key=lambda x: x[0], reverse=True)
+    return [(name, score) for _, name, score in keyed]
+
+ALGORITHMS = {
+    1: shuffle_v1,
+    2: shuffle_v2,
+}
+
+def version_for(month: int) -> int:
+    """
+    Args:
+        month (int): yyyymm
+    Returns:
+        int: 해당 달에 사용할 셔플 알고리즘 버전
+    """
+    return 2 if month >= SHUFFLE_V2_FROM else 1
+
+def weighted_shuffle(ranks: list, seed: str, month: int) -> list:
+    return ALGORITHMS[version_for(month)](ranks, seed)
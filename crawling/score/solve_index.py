@@ -0,0 +1,43 @@
+import datetime
+from repository import service
+
+class SolveIndex:
+    """
+    한 사용자의 점수 규칙 판단에 필요한 DB 상태를 한 번에 불러와 메모리에서 판단한다.
+    새로 푼 문제마다 DB를 조회하는 대신 add_solve, record_score로 이번 주기의 결과를 반영하며 판단한다.
+    """
+    def __init__(self, repeats: dict, scored_days: set) -> None:
+        self.__repeats = repeats            # {문제 번호: 푼 횟수}
+        self.__scored_days = scored_days    # 문제 풀이 점수를 받은 날짜들
+
+    def add_solve(self, problem: int) -> int:
+        """
+        풀이를 하나 기록한다.
+        Returns:
+            int: 이번 풀이 이전에 푼 횟수 (problem.repeatation)
+        """
+        repeat = self.__repeats.get(problem, 0)
+        self.__repeats[problem] = repeat + 1
+        return repeat
+
+    def has_score_on(self, time: datetime.datetime) -> bool:
+        return time.date() in self.__scored_days
+
+    def record_score(self, time: datetime.datetime) -> None:
+        self.__scored_days.add(time.date())
+
+def load(name: str, user_id: int, data: list) -> SolveIndex:
+    """
+    새로 푼 문제 목록에 필요한 만큼만 사용자 상태를 불러온다. (쿼리 2번)
+    Args:
+        name (str): 이름
+        user_id (int): 사용자 식별 번호
+        data (list of tuples): (solution, problem_id, datetime)
+    """
+    problems = list({problem for _, problem, _ in data})
+    since = min((time for _, _, time in data), default=datetime.datetime.now())
+    since = datetime.datetime(since.year, since.month, since.day)
+    return SolveIndex(
+        service.get_repeat_counts(name, problems),
+        service.get_scored_days(user_id, since),
+    )
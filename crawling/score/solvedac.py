@@ -1,77 +1,415 @@
-import time, schedule, os, sys, datetime
-from info import group_rank, user_info, solvedac_api
+import time, os, sys, datetime
+from concurrent.futures import ThreadPoolExecutor
+from info import group_rank, user_info, solvedac_api, boj_parser
 from repository import service
-import broadcast, logger
+from score.tier_cache import TierCache
+from score.activity import ActivityQueue
+from repository.write_buffer import WriteBuffer
+from score import solve_index, event_snapshot
+import broadcast, logger, metrics
 from logger import msg, warning, error, debug, LogLevel
 
 logger.set_level(LogLevel.DEBUG)
 
-problems_tier = {}
+TIER_CACHE_SIZE = int(os.getenv("TIER_CACHE_SIZE", "50000"))
+TIER_CACHE_TTL_DAYS = int(os.getenv("TIER_CACHE_TTL_DAYS", "30"))
+# 한 트랜잭션으로 묶어 쓸 사용자 수, INSERT 문 하나에 넣을 최대 행 수
+WRITE_BATCH_USERS = int(os.getenv("WRITE_BATCH_USERS", "20"))
+WRITE_BATCH_ROWS = int(os.getenv("WRITE_BATCH_ROWS", "1000"))
+# 활동 점수가 절반으로 줄어드는 시간
+ACTIVITY_HALF_LIFE_HOURS = float(os.getenv("ACTIVITY_HALF_LIFE_HOURS", "24"))
+# 한 주기에 사용자 한 명당 읽을 채점 현황 페이지 수. 넘기면 읽지 못한 구간을 crawl_cursor에 남기고 다음 주기에 이어서 읽는다.
+STATUS_PAGE_BUDGET = int(os.getenv("STATUS_PAGE_BUDGET", "4"))
+
+problems_tier = TierCache(TIER_CACHE_SIZE, datetime.timedelta(days=TIER_CACHE_TTL_DAYS))
+buffer = WriteBuffer(WRITE_BATCH_ROWS)
+activity = ActivityQueue(datetime.timedelta(hours=ACTIVITY_HALF_LIFE_HOURS))
 db_people = {}
+initializing = set()  # 백그라운드에서 초기화 중이라 정기 크롤링에서 빼는 사용자
+cursors = {}          # {name: (resume_top, stop_solution)}, 지난 주기에 다 읽지 못한 채점 현황 구간
+lease_holder = None   # 작업 큐에서 임대한 사용자를 처리 중이면 작업자 ID (score/work_queue.py)
+parse_failures = {}   # {name: 연속으로 BOJ 페이지를 해석하지 못한 주기 수}
+events = None
 
 def load_db():
     global db_people
+    load_onboarding()
+    load_cursors()
     for id, name, corrects, submissions, solution, kr_name, atcoder_handle, codeforce_handle, tier, ignored in service.get_user():
+        if name in initializing: continue
         db_people[name] = (corrects, submissions, solution)
+    load_events()
 
-def do_crawling(name, corrects, submissions):
-    if corrects == 0: return  # 맞힌 문제가 0이면 탐색 안함
+def load_cursors():
+    global cursors
+    cursors = service.get_crawl_cursors()
+
+def load_onboarding():
+    """
+    초기화가 끝나지 않은 사용자 목록을 불러온다. 끝난 사용자는 다음 load_db부터 크롤링 대상이 된다.
+    """
+    global initializing
+    initializing = service.get_initializing_names()
+    for name in initializing:
+        db_people.pop(name, None)
+
+def load_events():
+    global events
+    events = event_snapshot.load()
+
+def refresh_event_scores(names):
+    """
+    이벤트 정보는 그대로 두고 names 사용자들의 이벤트 점수 기록만 다시 읽는다.
+    작업 큐에서 임대한 사용자는 그 사이 다른 작업자가 점수를 기록했을 수 있다.
+    """
+    global events
+    if events is None:
+        events = event_snapshot.load()
+    event_snapshot.refresh_scored(events, names)
+
+def __events(oldest: datetime.datetime) -> event_snapshot.EventSnapshot:
+    # 주기 도중 이벤트가 시작하거나 끝나면 다시 불러온다. (사용자 단위로만 확인해 처리 중인 점수 기록이 섞이지 않게 한다)
+    # 반영할 풀이 중 가장 오래된 것이 불러온 기간보다 앞서면 그 시각부터 다시 불러온다.
+    global events
+    now = datetime.datetime.now()
+    if events.expired(now) or not events.covers(oldest):
+        events = event_snapshot.load(min(oldest, now - event_snapshot.EVENT_LOOKBACK))
+    return events
+
+def load_activity():
+    """
+    최근 풀이 기록으로 사용자별 활동 점수를 채운다. (시작 시 1회)
+    """
+    now = datetime.datetime.now()
+    solves = {}
+    for name, solved_at in service.get_recent_solve_times(now - datetime.timedelta(hours=ACTIVITY_HALF_LIFE_HOURS * 4)):
+        solves.setdefault(name, []).append(solved_at)
+    for name, times in solves.items():
+        activity.add_solves(name, times, now)
+    msg(f'최근 활동한 사용자 {len(solves)}명의 활동 점수를 불러왔습니다.')
+
+def load_tiers():
+    """
+    DB에 저장된 문제 티어 캐시를 불러온다. (시작 시 1회)
+    """
+    for problem, tier, updated_at in service.get_problem_tier_cache(TIER_CACHE_SIZE):
+        problems_tier.put(problem, tier, updated_at, dirty=False)
+    msg(f'문제 티어 캐시 {len(problems_tier)}개를 불러왔습니다.')
+
+def save_tiers():
+    """
+    이번 주기에 새로 조회한 문제 티어를 DB에 저장하고 캐시 적중률을 기록한다.
+    """
+    service.save_problem_tier_cache(problems_tier.pop_dirty())
+    hits, misses = problems_tier.pop_stats()
+    metrics.inc("tier_cache_total", hits, {"result": "hit"}, "문제 티어 캐시 조회 수")
+    metrics.inc("tier_cache_total", misses, {"result": "miss"}, "문제 티어 캐시 조회 수")
+    if hits + misses:
+        msg(f'문제 티어 캐시: 적중 {hits}회, 실패 {misses}회 (solved.ac 요청 {hits}회 절약)')
+
+def lookup_tiers(problems) -> dict:
+    """
+    문제 티어를 캐시에서 찾고, 없는 문제는 solved.ac에서 묶어서 조회한다.
+    Returns:
+        dict: {문제 번호: 티어}
+    """
+    return __load_tiers(problems)
 
-    user_tier = 0
-    date_time = datetime.datetime.now()
+def __load_tiers(problems) -> dict:
+    with metrics.stage("tier_lookup"):
+        return __lookup_tiers(problems)
+
+def __lookup_tiers(problems) -> dict:
+    tiers = {}
+    missing = []
+    for problem in problems:
+        if problem in tiers: continue
+        tiers[problem] = problems_tier.get(problem)
+        if tiers[problem] is None:
+            missing.append(problem)
+
+    # 캐시에 없는 문제들은 한 번에 묶어서 조회한다.
+    for problem, tier in solvedac_api.problem_tiers(missing).items():
+        problems_tier.put(problem, tier)
+        tiers[problem] = tier
+    return tiers
+
+def fetch(name, corrects, submissions):
+    """
+    BOJ, solved.ac에서 사용자 정보를 가져온다. DB에 접근하지 않으므로 여러 스레드에서 동시에 호출할 수 있다.
+    Args:
+        name (str): 이름
+        corrects (int): 맞은 문제
+        submissions (int): 제출
+    Returns:
+        tuple | None: (name, corrects, submissions, is_new, solution, user_tier, data, tiers, cursor, elapsed), 갱신할 필요가 없으면 None
+            is_new가 True면 data는 푼 문제 번호 리스트, 아니면 (solution, problem_id, datetime) 리스트
+            tiers는 data에 나오는 문제들의 {문제 번호: 티어}
+            cursor는 다음 주기에 이어서 읽을 (resume_top, stop_solution) 또는 None
+    """
+    if corrects == 0: return None  # 맞힌 문제가 0이면 탐색 안함
 
     if name in db_people:
-        # 제출 수 변화가 없으면 탐색 안함
-        if db_people[name][1] == submissions: 
-            msg(f'{name}님의 풀이 기록이 없습니다.')
-            return          
+        # 제출 수 변화가 없고 이어서 읽을 구간도 없으면 탐색 안함
+        if db_people[name][1] == submissions and name not in cursors:
+            msg(f'{name}님의 풀이 기록이 없습니다.', user=name)
+            activity.mark_refreshed(name, datetime.datetime.now())
+            return None
 
-        time.sleep(0.3)
-        msg(f'{name}님의 정보를 가져오는 중입니다.')
-        user_id = service.get_user_id(name)
-        data = user_info.recent_solved_problems(name, db_people[name][2])
+    time.sleep(0.3)
+    started = time.perf_counter()
+    msg(f'{name}님의 정보를 가져오는 중입니다.', user=name, stage="user_fetch")
+
+    try:
+        with metrics.stage("user_fetch"):
+            crawled = __fetch(name, corrects, submissions, started)
+    except boj_parser.ParseError as e:
+        __parse_failed(name, e)
+        return None
+    parse_failures.pop(name, None)
+    return crawled
 
+def __parse_failed(name, e):
+    """
+    해석하지 못한 행을 건너뛰면 마지막 제출 번호가 그 행을 넘어가 풀이가 영영 빠지므로,
+    이 사용자는 이번 주기에 DB를 갱신하지 않고 다음 주기에 같은 구간부터 다시 읽는다.
+    """
+    parse_failures[name] = parse_failures.get(name, 0) + 1
+    metrics.inc("parse_errors_total", 1, {"page": "status"}, "BOJ 페이지를 해석하지 못해 갱신하지 않은 사용자 수")
+    error(f'{name}님의 BOJ 페이지를 해석하지 못해 갱신하지 않습니다. (연속 {parse_failures[name]}회): {e}', user=name, failures=parse_failures[name])
+
+def probe(name):
+    """
+    랭킹을 다시 받지 않고 사용자의 채점 현황만 확인한다. 새로 푼 문제가 없으면 요청 1번으로 끝난다.
+    맞은 문제, 제출 수는 DB에 있는 값을 그대로 쓰며 다음 전체 크롤링에서 갱신된다.
+    Returns:
+        tuple | None: fetch와 같은 형식, 새로 푼 문제가 없거나 아직 초기화하지 않은 사용자면 None
+    """
+    if name not in db_people: return None
+    corrects, submissions, solution = db_people[name]
+    started = time.perf_counter()
+    try:
+        data, cursor, caught_up = __recent_solves(name, solution)
+        activity.mark_refreshed(name, datetime.datetime.now())
+        if not data and cursor == cursors.get(name): return None
+        msg(f'{name}님의 새 풀이 {len(data)}개를 발견했습니다.', user=name, solves=len(data))
         user_tier = solvedac_api.user_tier(name)
-        
-        last_solution = db_people[name][2]
+        tiers = __load_tiers(problem for _, problem, _ in data)
+    except boj_parser.ParseError as e:
+        __parse_failed(name, e)
+        return None
+    return (name, corrects, submissions, False, solution, user_tier, data, tiers, cursor, time.perf_counter() - started)
+
+def __fetch(name, corrects, submissions, started):
+    if name in db_people:
+        solution = db_people[name][2]
+        data, cursor, caught_up = __recent_solves(name, solution)
+        if not caught_up:
+            # 최근 제출까지 읽지 못했으므로 제출 수를 그대로 두어 다음 주기에도 다시 읽게 한다.
+            submissions = db_people[name][1]
+        user_tier = solvedac_api.user_tier(name)
+        tiers = __load_tiers(problem for _, problem, _ in data)
+        return (name, corrects, submissions, False, solution, user_tier, data, tiers, cursor, time.perf_counter() - started)
+
+    solution = user_info.last_solution(name, "init")
+    user_tier = solvedac_api.user_tier(name)
+    problems = user_info.solved_problems(name, "init")
+    tiers = __load_tiers(problems)
+    return (name, corrects, submissions, True, solution, user_tier, problems, tiers, None, time.perf_counter() - started)
+
+def __recent_solves(name, solution) -> tuple:
+    """
+    solution 이후의 맞은 제출을 STATUS_PAGE_BUDGET 페이지까지 읽는다.
+    지난 주기에 다 읽지 못한 구간이 있으면 그 구간부터 이어서 읽고, 남은 예산으로 최근 제출을 읽는다.
+    Returns:
+        tuple: (data, cursor, caught_up)
+            cursor: 다음 주기에 이어서 읽을 (resume_top, stop_solution), 남은 구간이 없으면 None
+            caught_up: 가장 최근 제출부터 읽었는지
+    """
+    budget = STATUS_PAGE_BUDGET
+    data = []
+    if name in cursors:
+        resume_top, stop_solution = cursors[name]
+        for rows, next_top in user_info.solved_pages(name, stop_solution, resume_top):
+            data.extend(rows)
+            budget -= 1
+            if next_top is not None and budget <= 0:
+                return data, (next_top, stop_solution), False
+        if budget <= 0:
+            return data, None, False
+
+    for rows, next_top in user_info.solved_pages(name, solution):
+        data.extend(rows)
+        budget -= 1
+        if next_top is not None and budget <= 0:
+            # 여기까지 읽은 풀이는 반영하고 마지막 제출 번호도 올리되, 그 아래로 남은 구간은 다음 주기에 읽는다.
+            msg(f'{name}님의 채점 현황이 {STATUS_PAGE_BUDGET}페이지를 넘어 {next_top}번 이하는 다음 주기에 이어서 읽습니다.', user=name)
+            metrics.inc("status_page_budget_exceeded_total", 1, None, "채점 현황 페이지 예산을 넘겨 다음 주기로 미룬 횟수")
+            return data, (next_top, solution), True
+    return data, None, True
+
+def apply(crawled):
+    """
+    fetch 결과로 점수를 계산하고 DB에 반영한다. 풀이/점수 기록은 buffer에 모았다가
+    WRITE_BATCH_USERS명마다 사용자 정보 갱신과 함께 한 트랜잭션으로 커밋한다. 마지막에는 flush()를 호출해야 한다.
+    현재 스레드에 묶인 DB 연결을 사용한다. (service.open_db 또는 service.session 안에서 호출)
+    lease_holder가 있으면 임대 행을 커밋할 때까지 잠가 두고, 임대를 잃은 사용자는 반영하지 않는다.
+    Args:
+        crawled (tuple | None): fetch의 반환값
+    """
+    if crawled is None: return
+    if lease_holder is not None and not service.hold_crawl_lease(crawled[0], lease_holder):
+        # 임대 기간이 지나 다른 작업자가 가져갔으므로 그쪽에서 반영한다. (같이 쓰면 점수가 두 번 들어간다)
+        warning(f'{crawled[0]}님의 임대가 다른 작업자에게 넘어가 반영하지 않습니다.', user=crawled[0])
+        metrics.inc("crawl_lease_lost_total", 1, None, "임대를 빼앗겨 반영하지 않은 사용자 수")
+        return
+    try:
+        solution = __apply(crawled)
+    except Exception:
+        # 커밋하지 않은 문장은 연결을 돌려줄 때 롤백된다.
+        buffer.discard()
+        raise
+
+    # 커밋된 뒤에만 메모리 상태를 바꾼다.
+    name, corrects, submissions, is_new, _, _, data, _, cursor, _ = crawled
+    def remember():
+        now = datetime.datetime.now()
+        db_people[name] = (corrects, submissions, solution)
+        if cursor is None:
+            cursors.pop(name, None)
+        else:
+            cursors[name] = cursor
+        if not is_new:
+            activity.add_solves(name, [date_time for _, _, date_time in data], now)
+        activity.mark_refreshed(name, now)
+    buffer.after_commit(remember)
+    metrics.inc("users_crawled_total", 1, {"kind": "new" if is_new else "update"}, "DB에 반영한 사용자 수")
+    buffer.users += 1
+    if buffer.users >= WRITE_BATCH_USERS:
+        flush()
+
+def flush():
+    """
+    모아 둔 풀이/점수 기록을 여러 행 INSERT로 쓰고, 그동안의 사용자 정보 갱신과 함께 커밋한다.
+    """
+    if buffer.users == 0: return
+    users = buffer.users
+    try:
+        with metrics.stage("db_write"), service.transaction():
+            statements = buffer.flush()
+    except Exception:
+        buffer.discard()
+        raise
+    buffer.committed()
+    debug(f'{users}명의 풀이/점수 기록을 INSERT {statements}번으로 저장했습니다.', stage="db_write", users=users, statements=statements)
+
+def __apply(crawled) -> int:
+    """
+    Returns:
+        int: DB에 저장한 마지막 제출 번호
+    """
+    name, corrects, submissions, is_new, solution, user_tier, data, tiers, cursor, elapsed = crawled
+
+    if not is_new:
+        user_id = service.get_user_id(name)
+        index = solve_index.load(name, user_id, data)
+        snapshot = __events(min((date_time for _, _, date_time in data), default=datetime.datetime.now()))
+
+        problem_rows = []   # (name, problem, problem_tier, time, level, repeatation)
+        scores = []         # (problem_rows의 위치, desc, event_id, time)
+        last_solution = solution
         for solution, problem, date_time in data:
             last_solution = max(last_solution, solution)
-            if not problem in problems_tier:
-                problems_tier[problem] = solvedac_api.problem_tier(problem)
-
-            level = problems_tier[problem] - user_tier
-            #print(level)
-            #print(service.is_solved_before(name, problem))
-            #print(service.has_got_score_today(name, date_time))
-            problem_id = service.add_problem(name, problem, problems_tier[problem], date_time, level)
-            
-            if not service.is_solved_before(name, problem) and not service.has_score_today(user_id, date_time) and (level >= -5 or problems_tier[problem] >= 11):
-                service.scored_by_problem(user_id, problem, problem_id, date_time)
-                msg(f'{name}님이 {problem}번 문제를 풀어 1점을 획득하였습니다.')
-            
-            if service.is_eventing_problem(problem, date_time):
-                ongoing_events = service.get_ongoing_events(date_time)
-                for event_id in ongoing_events:
-                    if service.is_first_solve_in_event_period(name, user_id, event_id, problem) and service.is_problem_in_event(event_id, problem):
-                        msg(f'{name}님이 이벤트 {event_id}의 {problem}번 문제를 풀어 1점을 획득하였습니다.')
-                        service.scored_by_event(user_id, event_id, problem, problem_id, date_time)
 
+            level = tiers[problem] - user_tier
+            repeatation = index.add_solve(problem)
+            problem_rows.append((name, problem, tiers[problem], date_time, level, repeatation))
+            row = len(problem_rows) - 1
+
+            if repeatation == 0 and not index.has_score_on(date_time) and (level >= -5 or tiers[problem] >= 11):
+                index.record_score(date_time)
+                scores.append((row, f'{problem}번 문제 해결', None, date_time))
+                msg(f'{name}님이 {problem}번 문제를 풀어 1점을 획득하였습니다.', user=name, problem=problem)
+
+            for event_id in snapshot.ongoing(problem, date_time):
+                if not snapshot.has_score(user_id, event_id, problem):
+                    snapshot.record_score(user_id, event_id, problem)
+                    scores.append((row, f"Event(#{event_id})의 {problem}번 문제 해결", event_id, date_time))
+                    msg(f'{name}님이 이벤트 {event_id}의 {problem}번 문제를 풀어 1점을 획득하였습니다.', user=name, problem=problem, event=event_id)
+
+        rows = [buffer.add_problem(*problem_row) for problem_row in problem_rows]
+        for row, desc, event_id, created_at in scores:
+            buffer.add_score_history(user_id, desc, 1, event_id, rows[row], created_at)
         service.update_user(name, corrects, submissions, last_solution, user_tier)
-        msg(f'{name}님 정보의 업데이트가 완료되었습니다. (새로 푼 문제 수: {len(data)})')
+        if cursor != cursors.get(name):
+            service.save_crawl_cursor(name, cursor, datetime.datetime.now())
+        msg(f'{name}님 정보의 업데이트가 완료되었습니다. (새로 푼 문제 수: {len(data)})', user=name, solves=len(data), duration=round(elapsed, 3))
+        return last_solution
 
     else:
-        time.sleep(0.3)
-        msg(f'{name}님의 정보를 가져오는 중입니다.')
-        solution = user_info.last_solution(name, "init")
-        user_tier = solvedac_api.user_tier(name)
         service.update_user(name, corrects, submissions, solution, user_tier)
 
-        problems = user_info.solved_problems(name, "init")
-        for problem in problems:
-            if not problem in problems_tier:
-                problems_tier[problem] = solvedac_api.problem_tier(problem)
-            level = problems_tier[problem] - user_tier
-            service.add_problem(name, problem, problems_tier[problem], datetime.datetime(1970,1,1), level)
+        repeats = service.get_repeat_counts(name, data)
+        for problem in data:
+            level = tiers[problem] - user_tier
+            buffer.add_problem(name, problem, tiers[problem], datetime.datetime(1970,1,1), level, repeats.get(problem, 0))
+
+        msg(f'{name}님 정보를 초기화 했습니다. (맞힌 문제 수: {corrects}, 제출 수: {submissions})', user=name, corrects=corrects, submissions=submissions, duration=round(elapsed, 3))
+        return solution
 
-        msg(f'{name}님 정보를 초기화 했습니다. (맞힌 문제 수: {corrects}, 제출 수: {submissions})')
-    service.db_commit()
\ No newline at end of file
+def do_crawling(name, corrects, submissions):
+    apply(fetch(name, corrects, submissions))
+    flush()
+
+def __hand_off_new_members(people) -> list:
+    """
+    처음 보는 사용자는 초기화 작업자(score/onboarding.py)에게 넘기고, 초기화 중인 사용자와 함께 이번 크롤링에서 뺀다.
+    """
+    now = datetime.datetime.now()
+    new = [(name, corrects, submissions, now) for name, corrects, submissions in people
+           if corrects > 0 and name not in db_people and name not in initializing]
+    if new:
+        with service.transaction():
+            service.add_onboarding(new)
+        initializing.update(name for name, _, _, _ in new)
+        msg(f'새 멤버 {len(new)}명의 초기화를 백그라운드 작업에 맡깁니다.')
+    return [person for person in people if person[0] in db_people and person[0] not in initializing]
+
+def crawl_all(people, workers: int = 1, deadline: float = None) -> tuple:
+    """
+    그룹 멤버 전체를 크롤링한다.
+    workers가 2 이상이면 네트워크 작업(fetch)은 스레드 풀에서 동시에 처리하고,
+    DB 반영(apply)은 멤버 순서대로 현재 스레드에서 처리한다.
+    Args:
+        people (list of tuples): (name, corrects, submissions)
+        workers (int): 동시에 가져올 사용자 수
+        deadline (float): time.monotonic() 기준 마감 시각. 지나면 남은 사용자는 다음 주기로 미룬다.
+    Returns:
+        tuple: (사용자별 fetch 소요 시간의 합, 마감 시각이 지나 건너뛴 사용자 수)
+    """
+    def fetch_before_deadline(person):
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        return fetch(*person)
+
+    people = __hand_off_new_members(people)
+    # 최근에 많이 풀었고 오래 갱신하지 않은 사용자부터 처리한다. (시간 예산을 넘기면 뒤쪽 사용자가 미뤄진다)
+    people = activity.order(people, datetime.datetime.now())
+    fetched_time = 0.0
+    skipped = 0
+    if workers <= 1:
+        for crawled in map(fetch_before_deadline, people):
+            if crawled is False: skipped += 1; continue
+            if crawled is not None: fetched_time += crawled[-1]
+            apply(crawled)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # map은 제출 순서대로 결과를 돌려주므로 사용자별 DB 반영 순서가 유지된다.
+            for crawled in executor.map(fetch_before_deadline, people):
+                if crawled is False: skipped += 1; continue
+                if crawled is not None: fetched_time += crawled[-1]
+                apply(crawled)
+    flush()
+    if skipped:
+        warning(f"주기 시간 예산을 넘겨 {skipped}명의 크롤링을 다음 주기로 미룹니다.")
+    return fetched_time, skipped
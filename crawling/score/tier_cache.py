@@ -0,0 +1,66 @@
+import datetime, threading
+from collections import OrderedDict
+
+class TierCache:
+    """
+    문제 번호 -> 문제 티어 캐시.
+    capacity를 넘으면 가장 오래 사용하지 않은 항목부터 버리고(LRU),
+    ttl이 지난 항목은 없는 것으로 취급해 다시 조회하게 한다(티어 재조정 반영).
+    """
+    def __init__(self, capacity: int, ttl: datetime.timedelta) -> None:
+        self.__capacity = capacity
+        self.__ttl = ttl
+        self.__items = OrderedDict()  # problem -> (tier, updated_at)
+        self.__dirty = {}             # DB에 아직 저장하지 않은 항목
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.__items)
+
+    def get(self, problem: int):
+        """
+        Returns:
+            int | None: 캐시에 없거나 만료되었으면 None
+        """
+        with self.__lock:
+            item = self.__items.get(problem)
+            if item is None or datetime.datetime.now() - item[1] > self.__ttl:
+                self.misses += 1
+                return None
+            self.__items.move_to_end(problem)
+            self.hits += 1
+            return item[0]
+
+    def put(self, problem: int, tier: int, updated_at: datetime.datetime = None, dirty: bool = True) -> None:
+        if tier is None: return  # 조회 실패는 캐시하지 않는다
+        if updated_at is None: updated_at = datetime.datetime.now()
+        with self.__lock:
+            self.__items[problem] = (tier, updated_at)
+            self.__items.move_to_end(problem)
+            if dirty:
+                self.__dirty[problem] = (tier, updated_at)
+            while len(self.__items) > self.__capacity:
+                self.__items.popitem(last=False)
+
+    def pop_dirty(self) -> list:
+        """
+        마지막 호출 이후 새로 조회된 항목들을 꺼낸다.
+        Returns:
+            list of tuples: (problem, tier, updated_at)
+        """
+        with self.__lock:
+            dirty = [(problem, tier, updated_at) for problem, (tier, updated_at) in self.__dirty.items()]
+            self.__dirty.clear()
+            return dirty
+
+    def pop_stats(self) -> tuple:
+        """
+        Returns:
+            tuple: 마지막 호출 이후의 (hits, misses)
+        """
+        with self.__lock:
+            stats = (self.hits, self.misses)
+            self.hits = self.misses = 0
+            return stats
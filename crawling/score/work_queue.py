@@ -0,0 +1,96 @@
+import os, time, socket, datetime
+from repository import service
+from score import solvedac
+import metrics
+from logger import msg, warning, error, debug
+from dotenv import load_dotenv
+load_dotenv()
+
+# 한 번에 임대할 사용자 수, 임대 기간(초), 할 일이 없을 때 기다리는 시간(초)
+CRAWL_LEASE_SIZE = int(os.getenv("CRAWL_LEASE_SIZE", "10"))
+CRAWL_LEASE_SECONDS = int(os.getenv("CRAWL_LEASE_SECONDS", "300"))
+CRAWL_QUEUE_POLL = float(os.getenv("CRAWL_QUEUE_POLL", "2"))
+# 임대 기간 안에 끝내지 못해도 다시 임대할 최대 횟수. 넘기면 이번 주기에는 failed로 두고 다음 주기에 다시 넣는다.
+CRAWL_MAX_ATTEMPTS = int(os.getenv("CRAWL_MAX_ATTEMPTS", "3"))
+
+WORKER_ID = f'{socket.gethostname()}-{os.getpid()}'
+
+def publish(people: list, now: datetime.datetime) -> tuple:
+    """
+    이번 주기에 갱신할 사용자들을 작업 큐에 넣는다. (코디네이터)
+    제출 수가 그대로이고 이어서 읽을 채점 현황 구간도 없는 사용자는 넣지 않고(solvedac.fetch와 같은 조건),
+    다른 작업자가 아직 처리 중인 사용자는 덮어쓰지 않는다.
+    Args:
+        people (list of tuples): (name, corrects, submissions), 우선순위 순서
+    Returns:
+        tuple: (cycle_id, 넣은 사용자 수)
+    """
+    cycle_id = int(now.timestamp())
+    active = service.get_active_leases(now)
+    solvedac.load_cursors()
+    rows = []
+    for priority, (name, corrects, submissions) in enumerate(people):
+        if corrects == 0 or name in active: continue
+        if name in solvedac.db_people and solvedac.db_people[name][1] == submissions and name not in solvedac.cursors: continue
+        rows.append((name, cycle_id, corrects, submissions, priority, now))
+    with service.transaction():
+        service.publish_crawl_queue(rows)
+    return cycle_id, len(rows)
+
+def remaining(cycle_id: int) -> int:
+    with service.transaction():
+        return service.count_crawl_queue_remaining(cycle_id)
+
+def work_once(workers: int = 1) -> int:
+    """
+    사용자 몇 명을 임대해 크롤링하고 완료로 표시한다. 임대 기간 안에 끝내지 못하면 다른 작업자가 다시 가져간다.
+    임대를 빼앗긴 사용자는 DB에 반영하지 않는다. (solvedac.apply의 lease_holder 확인)
+    Returns:
+        int: 처리한 사용자 수
+    """
+    now = datetime.datetime.now()
+    with service.transaction():
+        leased, failed = service.lease_crawl_queue(WORKER_ID, CRAWL_LEASE_SIZE, now, now + datetime.timedelta(seconds=CRAWL_LEASE_SECONDS), CRAWL_MAX_ATTEMPTS)
+    if failed:
+        warning(f'{CRAWL_MAX_ATTEMPTS}번 임대해도 끝내지 못한 {len(failed)}명을 이번 주기에서 뺍니다: {", ".join(failed)}')
+        metrics.inc("crawl_queue_failed_total", len(failed), None, "임대 횟수를 넘겨 failed로 옮긴 사용자 수")
+    if not leased: return 0
+
+    # 다른 작업자가 갱신했을 수 있으므로 임대한 사용자의 DB 상태를 새로 읽는다.
+    names = [name for name, _, _ in leased]
+    for name in names:
+        solvedac.db_people.pop(name, None)
+    solvedac.load_onboarding()
+    solvedac.load_cursors()
+    for name, corrects, submissions, solution in service.get_people(names):
+        if name in solvedac.initializing: continue
+        solvedac.db_people[name] = (corrects, submissions, solution)
+    # 이벤트 정보는 시작하거나 끝날 때만 다시 불러오고(EventSnapshot.expired), 점수 기록은 임대한 사용자 것만 읽는다.
+    solvedac.refresh_event_scores(names)
+
+    solvedac.lease_holder = WORKER_ID
+    try:
+        solvedac.crawl_all(leased, workers)
+    finally:
+        solvedac.lease_holder = None
+    with service.transaction():
+        solvedac.save_tiers()
+        service.complete_crawl_queue(names, WORKER_ID, datetime.datetime.now())
+    debug(f'작업 큐에서 {len(names)}명을 처리했습니다. ({WORKER_ID})')
+    return len(names)
+
+def run(workers: int = 1) -> None:
+    """
+    작업자 역할. 작업 큐가 빌 때까지 처리하고, 비어 있으면 잠시 기다린다.
+    """
+    msg(f'크롤링 작업자 시작 ({WORKER_ID})')
+    while True:
+        try:
+            with service.session():
+                while True:
+                    users = work_once(workers)
+                    if users == 0: break
+                    metrics.dump_cycle({"worker": WORKER_ID, "users": users})
+        except Exception as e:
+            error(f'크롤링 작업자 에러: {str(e)}')
+        time.sleep(CRAWL_QUEUE_POLL)
@@ -0,0 +1,5 @@
+import os, sys
+
+# 크롤러 모듈은 import할 때 .env의 설정을 읽는다. 테스트는 DB에 연결하지 않으므로 없으면 기본값만 채운다.
+os.environ.setdefault("DB_PORT", "3306")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,45 @@
+import datetime
+import pytest
+from info import boj_parser, user_info
+from score import solvedac
+
+def status_row(solution: int, problem: int, result: str = "ac") -> str:
+    return (
+        f'<tr id="solution-{solution}"><td>{solution}</td><td><a href="/user/tester">tester</a></td>'
+        f'<td><a href="/problem/{problem}" class="problem_title">{problem}</a></td>'
+        f'<td class="result"><span class="result-text result-{result}">결과</span></td>'
+        f'<td class="memory">2020</td><td class="time">0</td><td>C++17</td><td>300</td>'
+        f'<td><a href="" title="2024-08-25 19:52:59" class="real-time-update">0분 전</a></td></tr>')
+
+BROKEN_ROW = '<tr id="solution-105"><td>105</td><td>해석할 수 없는 행</td></tr>'
+
+def status_page(*rows: str) -> str:
+    return f'<table class="table" id="status-table"><thead><tr><th>제출 번호</th></tr></thead><tbody>{"".join(rows)}</tbody></table>'
+
+class Response:
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+def test_status_rows():
+    rows = list(boj_parser.status_rows(status_page(status_row(102, 1000), status_row(101, 1001, "wa"))))
+    assert rows == [
+        boj_parser.StatusRow(102, 1000, "ac", datetime.datetime(2024, 8, 25, 19, 52, 59)),
+        boj_parser.StatusRow(101, 1001, "wa", datetime.datetime(2024, 8, 25, 19, 52, 59)),
+    ]
+
+def test_status_rows_broken_row():
+    with pytest.raises(boj_parser.ParseError):
+        list(boj_parser.status_rows(status_page(status_row(106, 1000), BROKEN_ROW, status_row(104, 1002))))
+
+def test_fetch_keeps_watermark_on_broken_row(monkeypatch):
+    # 깨진 행(105)이 맞은 제출일 수 있으므로 그 위아래를 반영하지 않고 다음 주기에 100번 이후부터 다시 읽어야 한다.
+    html = status_page(status_row(106, 1000), BROKEN_ROW, status_row(104, 1002), status_row(100, 1003))
+    monkeypatch.setattr(user_info.client, "get", lambda url, **kwargs: Response(html))
+    monkeypatch.setattr(solvedac.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(solvedac, "db_people", {"tester": (3, 10, 100)})
+    monkeypatch.setattr(solvedac, "cursors", {})
+    monkeypatch.setattr(solvedac, "parse_failures", {})
+
+    assert solvedac.fetch("tester", 4, 14) is None
+    assert solvedac.db_people["tester"] == (3, 10, 100)
+    assert solvedac.parse_failures == {"tester": 1}
@@ -0,0 +1,10 @@
+-- migrations/002_problem_tier_cache.sql
+-- 크롤러가 solved.ac에서 조회한 문제 티어를 재시작 후에도 재사용하기 위한 캐시 테이블입니다.
+
+CREATE TABLE IF NOT EXISTS `problem_tier_cache` (
+  `problem` int NOT NULL,
+  `tier` int NOT NULL,
+  `updated_at` datetime NOT NULL,
+  PRIMARY KEY (`problem`),
+  KEY `idx_updated_at` (`updated_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,6 @@
+-- migrations/003_score_history_month_index.sql
+-- 크롤러가 5분마다 이번 달 점수를 사용자별로 합산(GROUP BY)할 때
+-- 테이블을 읽지 않고 인덱스만으로 처리할 수 있도록 커버링 인덱스를 추가합니다.
+
+ALTER TABLE `score_history`
+  ADD KEY `idx_created_user_bias` (`created_at`, `user_id`, `bias`);
@@ -0,0 +1,16 @@
+-- migrations/004_webhook_outbox.sql
+-- 추첨 결과 알림을 크롤링 트랜잭션과 분리해 보내기 위한 아웃박스 테이블입니다.
+-- 크롤러는 알림을 pending으로 기록만 하고, 전송 작업자가 가장 최근 알림만 디스코드로 보냅니다.
+
+CREATE TABLE IF NOT EXISTS `webhook_outbox` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `content` text NOT NULL,
+  `status` enum('pending','delivered','superseded','failed') NOT NULL DEFAULT 'pending',
+  `attempts` int NOT NULL DEFAULT '0',
+  `next_attempt_at` datetime NOT NULL,
+  `last_error` varchar(255) DEFAULT NULL,
+  `created_at` datetime NOT NULL,
+  `delivered_at` datetime DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_status_next_attempt` (`status`, `next_attempt_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,20 @@
+-- migrations/005_crawl_queue.sql
+-- 여러 크롤러 프로세스가 사용자를 나눠 처리하기 위한 작업 큐 테이블입니다.
+-- 코디네이터가 주기마다 갱신이 필요한 사용자를 pending으로 넣고,
+-- 작업자들은 SELECT ... FOR UPDATE SKIP LOCKED로 겹치지 않게 임대(lease)해 처리합니다.
+
+CREATE TABLE IF NOT EXISTS `crawl_queue` (
+  `name` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
+  `cycle_id` bigint NOT NULL,
+  `corrects` int NOT NULL,
+  `submissions` int NOT NULL,
+  `priority` int NOT NULL DEFAULT '0',
+  `status` enum('pending','leased','done') NOT NULL DEFAULT 'pending',
+  `leased_by` varchar(100) DEFAULT NULL,
+  `lease_until` datetime DEFAULT NULL,
+  `attempts` int NOT NULL DEFAULT '0',
+  `updated_at` datetime NOT NULL,
+  PRIMARY KEY (`name`),
+  KEY `idx_status_priority` (`status`, `priority`),
+  KEY `idx_cycle_status` (`cycle_id`, `status`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
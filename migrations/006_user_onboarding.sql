@@ -0,0 +1,21 @@
+-- migrations/006_user_onboarding.sql
+-- 새로 가입한 그룹 멤버의 초기화(맞은 문제 전체 저장)를 크롤링 주기와 분리해 백그라운드에서 처리하기 위한 테이블입니다.
+-- initializing인 사용자는 정기 크롤링에서 제외되고, 초기화 작업자가 중단되어도 저장한 문제 이후부터 이어서 처리합니다.
+
+CREATE TABLE IF NOT EXISTS `user_onboarding` (
+  `name` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
+  `status` enum('initializing','done') NOT NULL DEFAULT 'initializing',
+  `corrects` int NOT NULL,
+  `submissions` int NOT NULL,
+  `solution` int unsigned DEFAULT NULL,
+  `tier` int DEFAULT NULL,
+  `problems_total` int NOT NULL DEFAULT '0',
+  `problems_done` int NOT NULL DEFAULT '0',
+  `attempts` int NOT NULL DEFAULT '0',
+  `next_attempt_at` datetime NOT NULL,
+  `last_error` varchar(255) DEFAULT NULL,
+  `created_at` datetime NOT NULL,
+  `updated_at` datetime NOT NULL,
+  PRIMARY KEY (`name`),
+  KEY `idx_status_next_attempt` (`status`, `next_attempt_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -0,0 +1,11 @@
+-- migrations/007_crawl_cursor.sql
+-- 한 주기에 읽을 채점 현황 페이지 수(STATUS_PAGE_BUDGET)를 넘긴 사용자의 읽지 못한 구간을 기록합니다.
+-- 다음 주기에는 resume_top부터 stop_solution(지난 번 마지막 제출 번호)까지 이어서 읽어 풀이 기록이 빠지지 않게 합니다.
+
+CREATE TABLE IF NOT EXISTS `crawl_cursor` (
+  `name` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
+  `resume_top` int unsigned NOT NULL,
+  `stop_solution` int unsigned NOT NULL,
+  `updated_at` datetime NOT NULL,
+  PRIMARY KEY (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -0,0 +1,6 @@
+-- migrations/008_crawl_queue_failed.sql
+-- 임대 기간 안에 끝내지 못한 횟수가 CRAWL_MAX_ATTEMPTS에 이른 사용자를 failed로 옮겨 더 이상 임대하지 않습니다.
+-- failed인 사용자는 남은 작업으로 세지 않으므로 코디네이터가 끝없이 기다리지 않고, 다음 주기에 다시 pending으로 들어갑니다.
+
+ALTER TABLE `crawl_queue`
+  MODIFY `status` enum('pending','leased','done','failed') NOT NULL DEFAULT 'pending';
@@ -0,0 +1,6 @@
+-- migrations/009_webhook_outbox_sending.sql
+-- 전송 작업자가 알림을 보내기 전에 sending으로 바꿔 두어, 작업자가 여럿이어도 같은 알림을 두 번 보내지 않게 합니다.
+-- sending인 행의 next_attempt_at은 임대 만료 시각입니다. 전송 도중 작업자가 죽으면 만료 뒤 다른 작업자가 다시 가져갑니다.
+
+ALTER TABLE `webhook_outbox`
+  MODIFY `status` enum('pending','sending','delivered','superseded','failed') NOT NULL DEFAULT 'pending';
@@ -0,0 +1,6 @@
+-- migrations/010_user_onboarding_failed.sql
+-- ONBOARDING_MAX_ATTEMPTS번 실패한 초기화 작업을 failed로 옮겨 더 이상 재시도하지 않습니다.
+-- failed인 사용자도 정기 크롤링에서는 계속 빠지며, 원인을 해결한 뒤 status를 initializing, attempts를 0으로 되돌리면 다시 처리합니다.
+
+ALTER TABLE `user_onboarding`
+  MODIFY `status` enum('initializing','done','failed') NOT NULL DEFAULT 'initializing';